@@ -0,0 +1,85 @@
+# Backend client for app.py: one pooled keep-alive HTTP session with timeouts, and
+# history/stats cached with st.cache_data and revalidated by ETag (If-None-Match -> 304).
+import os
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+# (connect, read) seconds; the first /analyze after a cold start waits for the model
+TIMEOUT = (3.05, float(os.getenv("API_TIMEOUT", "60")))
+
+
+@st.cache_resource
+def _session():
+    # One pooled session per Streamlit server process, shared by every browser session
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(os.getenv("API_POOL_SIZE", "16")))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _headers():
+    token = st.session_state.get("token")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def request(method, path, headers=None, **kwargs):
+    kwargs.setdefault("timeout", TIMEOUT)
+    return _session().request(method, f"{API_URL}{path}", headers={**_headers(), **(headers or {})}, **kwargs)
+
+
+def get(path, **kwargs):
+    return request("GET", path, **kwargs)
+
+
+def post(path, **kwargs):
+    return request("POST", path, **kwargs)
+
+
+def put(path, **kwargs):
+    return request("PUT", path, **kwargs)
+
+
+def delete(path, **kwargs):
+    return request("DELETE", path, **kwargs)
+
+
+@st.cache_data(max_entries=256, ttl=3600, show_spinner=False)
+def _remember(path, params, etag, _body=None):
+    # Keyed by (path, params, ETag): a call with `_body` stores it, a call without it
+    # returns the stored body. Exceptions are never cached, so an evicted entry raises.
+    if _body is None:
+        raise KeyError(etag)
+    return _body
+
+
+def get_cached(path, params=None):
+    """GET that revalidates with the last ETag; returns (status_code, json or None).
+
+    An unchanged diary costs the server one version lookup and sends no body.
+    """
+    key = (path, tuple(sorted((params or {}).items())))
+    etags = st.session_state.setdefault("etags", {})
+    etag = etags.get(key)
+    res = get(path, params=params, headers={"If-None-Match": etag} if etag else None)
+    if res.status_code == 304:
+        try:
+            return 200, _remember(path, key[1], etag)
+        except KeyError:
+            del etags[key]
+            return get_cached(path, params)
+    if res.status_code != 200:
+        return res.status_code, None
+    body = res.json()
+    if res.headers.get("ETag"):
+        etags[key] = res.headers["ETag"]
+        _remember(path, key[1], res.headers["ETag"], _body=body)
+    return 200, body
+
+
+def invalidate():
+    """Forget the ETags after analyze/update/delete so the next read is a full fetch."""
+    st.session_state["etags"] = {}
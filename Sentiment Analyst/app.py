@@ -1,23 +1,75 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import requests
+import time
 import pandas as pd
 import plotly.express as px
 
+# URL e Backend-it tuaj FastAPI (API_URL), sesioni HTTP dhe tokeni janë te api_client
+import api_client as api
+
 st.set_page_config(page_title="AI Movie Diary", layout="wide")
 
-# URL e Backend-it tuaj FastAPI
-API_URL = "http://127.0.0.1:8000"
+# Explanations are computed in the background; poll until ready (or give up)
+def wait_for_explanation(job_id, timeout=30, interval=0.25):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = api.get(f"/explanation/{job_id}").json()
+        if job.get("status") == "done":
+            return job["explanation_html"]
+        if job.get("status") != "pending":
+            return None
+        time.sleep(interval)
+    return None
+
+HISTORY_PAGE_SIZE = 200
+
+# History is loaded one page at a time; reruns only pull rows newer than the newest one we have
+def fetch_history(older=False):
+    rows = st.session_state.history
+    if not rows:
+        params = {"limit": HISTORY_PAGE_SIZE}
+    elif older:
+        params = {"before_id": rows[-1]['id'], "limit": HISTORY_PAGE_SIZE}
+    else:
+        params = {"since_id": rows[0]['id']}
+    # Unchanged history is answered with 304 and served from the local cache
+    status, page = api.get_cached(f"/history/{st.session_state.username}", params)
+    if status == 401:
+        st.session_state.logged_in = False # Sesioni skadoi, kërkohet hyrje e re
+        return None
+    if status != 200:
+        return None
+    st.session_state.history = (rows or []) + page if older else page + (rows or [])
+    return st.session_state.history
+
+# Figures are rebuilt only when the stats change, not on every widget interaction
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_charts(stats):
+    sentiment_counts = pd.DataFrame(list(stats['sentiment_counts'].items()), columns=['Sentiment', 'Count'])
+    fig_pie = px.pie(sentiment_counts, values='Count', names='Sentiment', 
+                     title='Overall Movie Sentiment',
+                     color='Sentiment',
+                     color_discrete_map={'POSITIVE':'#2ecc71', 'NEGATIVE':'#e74c3c'})
+    buckets = pd.DataFrame(stats['confidence_histogram'])
+    buckets['Confidence'] = [f"{b['start']:.0%}–{b['end']:.0%}" for b in stats['confidence_histogram']]
+    fig_hist = px.bar(buckets, x="Confidence", y="count",
+                      title="AI Prediction Confidence",
+                      color_discrete_sequence=['#3498db'])
+    return fig_pie, fig_hist
 
 # --- 1. SESSION STATE INITIALIZATION ---
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "username" not in st.session_state:
     st.session_state.username = None
+if "token" not in st.session_state:
+    st.session_state.token = None
 if "last_explanation" not in st.session_state:
     st.session_state.last_explanation = None
 if "auto_review" not in st.session_state:
     st.session_state.auto_review = ""
+if "history" not in st.session_state:
+    st.session_state.history = None
 
 # --- 2. SIDEBAR: AUTHENTICATION & SETTINGS ---
 with st.sidebar:
@@ -31,10 +83,11 @@ with st.sidebar:
         if auth_mode == "Login":
             if st.button("Sign In"):
                 try:
-                    res = requests.post(f"{API_URL}/login", json={"username": user_input, "password": pass_input})
+                    res = api.post("/login", json={"username": user_input, "password": pass_input})
                     if res.status_code == 200:
                         st.session_state.logged_in = True
                         st.session_state.username = user_input
+                        st.session_state.token = res.json()["token"]
                         st.success(f"Welcome back, {user_input}!")
                         st.rerun()
                     else:
@@ -46,7 +99,7 @@ with st.sidebar:
             if st.button("Create Account"):
                 if user_input and pass_input:
                     try:
-                        res = requests.post(f"{API_URL}/signup", json={"username": user_input, "password": pass_input})
+                        res = api.post("/signup", json={"username": user_input, "password": pass_input})
                         if res.status_code == 200:
                             st.success("✨ Account created! Please switch to Login.")
                         else:
@@ -95,15 +148,19 @@ else:
                     payload = {
                         "movie": movie_name, 
                         "review": user_review,
-                        "username": st.session_state.username
+                        "username": st.session_state.username,
+                        "explain": not fast_mode
                     }
                     try:
-                        res = requests.post(f"{API_URL}/analyze", json=payload)
+                        res = api.post("/analyze", json=payload)
                         if res.status_code == 200:
+                            api.invalidate()
                             data = res.json()
-                            if not fast_mode and 'explanation_html' in data:
-                                custom_css = "<style>body{color:white !important;} .lime.explanation{background-color:#0e1117;} text{fill:white !important;}</style>"
-                                st.session_state.last_explanation = custom_css + data['explanation_html']
+                            if data.get('job_id'):
+                                html = wait_for_explanation(data['job_id'])
+                                if html:
+                                    custom_css = "<style>body{color:white !important;} .lime.explanation{background-color:#0e1117;} text{fill:white !important;}</style>"
+                                    st.session_state.last_explanation = custom_css + html
                             
                             st.session_state.auto_review = "" # Resetojmë fushën pas ruajtjes
                             st.rerun()
@@ -123,38 +180,34 @@ else:
     st.subheader("📜 Your Watch History")
     
     try:
-        hist_res = requests.get(f"{API_URL}/history/{st.session_state.username}")
-        if hist_res.status_code == 200:
-            df = pd.DataFrame(hist_res.json())
+        rows = fetch_history()
+        stats_status, stats = api.get_cached(f"/stats/{st.session_state.username}")
+        if rows is not None and stats_status == 200:
+            df = pd.DataFrame(rows)
             if not df.empty:
                 
                 # --- ANALIZA VIZUALE ---
+                # Llogaritet në server, pavarësisht sa e gjatë është historia
                 st.write("### 📊 AI Insights")
                 c_chart1, c_chart2 = st.columns(2)
+                fig_pie, fig_hist = build_charts(stats)
                 
                 with c_chart1:
-                    label_col = 'sentiment' if 'sentiment' in df.columns else 'label'
-                    sentiment_counts = df[label_col].value_counts().reset_index()
-                    sentiment_counts.columns = ['Sentiment', 'Count']
-                    
-                    fig_pie = px.pie(sentiment_counts, values='Count', names='Sentiment', 
-                                     title='Overall Movie Sentiment',
-                                     color='Sentiment',
-                                     color_discrete_map={'POSITIVE':'#2ecc71', 'NEGATIVE':'#e74c3c'})
                     # Rregulluar për Streamlit 2026
                     st.plotly_chart(fig_pie, width='stretch')
 
                 with c_chart2:
-                    fig_hist = px.histogram(df, x="confidence", nbins=10, 
-                                            title="AI Prediction Confidence",
-                                            color_discrete_sequence=['#3498db'])
                     # Rregulluar për Streamlit 2026
                     st.plotly_chart(fig_hist, width='stretch')
                 
                 st.divider()
 
                 cols_to_show = [c for c in df.columns if c != 'owner']
-                st.dataframe(df[cols_to_show], width='stretch', hide_index=True)
+                st.dataframe(df[cols_to_show], width='stretch', hide_index=True,
+                             column_config={"confidence": st.column_config.NumberColumn(format="percent")})
+                if len(rows) < stats['total'] and st.button(f"Load older entries ({len(rows)} of {stats['total']} shown)"):
+                    fetch_history(older=True)
+                    st.rerun()
 
                 # --- UPDATE & DELETE (CRUD) ---
                 st.write("---")
@@ -169,14 +222,18 @@ else:
                     if st.button("Confirm Update"):
                         if up_title and up_text:
                             params = {"new_movie_name": up_title, "new_review_text": up_text}
-                            if requests.put(f"{API_URL}/update/{sel_id}", params=params).status_code == 200:
+                            if api.put(f"/update/{sel_id}", params=params).status_code == 200:
+                                api.invalidate()
+                                st.session_state.history = None # Rreshtat ekzistues ndryshuan, rifresko gjithçka
                                 st.success("Updated!")
                                 st.rerun()
 
                 with c2:
                     st.write("**🗑️ Delete Record**")
                     if st.button("Delete Permanently", type="primary"):
-                        if requests.delete(f"{API_URL}/delete/{sel_id}").status_code == 200:
+                        if api.delete(f"/delete/{sel_id}").status_code == 200:
+                            api.invalidate()
+                            st.session_state.history = None
                             st.warning("Deleted!")
                             st.rerun()
             else:
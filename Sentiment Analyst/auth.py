@@ -0,0 +1,74 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool, so hashing never blocks the event loop.
+
+    bcrypt releases the GIL while it works; `max_workers` caps how many cores
+    a burst of logins can take away from inference.
+    """
+
+    def __init__(self, rounds=12, max_workers=2):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                                    bcrypt__ident="2b", bcrypt__rounds=rounds)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    async def hash(self, password):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.context.hash, password)
+
+    async def verify(self, password, hashed):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.context.verify,
+                                                                password, hashed)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    """Stateless session tokens: "<username>.<expiry>.<HMAC-SHA256>", all base64url.
+
+    Verifying one is a single HMAC, with no database lookup or hashing. Tokens
+    stay valid until they expire; changing `secret` revokes all of them.
+    Without a secret a random one is generated, so tokens don't survive a
+    restart and aren't shared between server processes.
+    """
+
+    def __init__(self, secret=None, ttl=12 * 3600):
+        if not secret:
+            print("⚠️ SESSION_SECRET is not set; sessions end when the server restarts.")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode()
+        self.ttl = ttl
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, username):
+        payload = f"{_b64(username.encode())}.{int(time.time() + self.ttl)}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token):
+        """Returns the username, or None for a forged, malformed or expired token."""
+        try:
+            user, expires, signature = token.split(".")
+            # Bytes: compare_digest raises TypeError on non-ASCII str
+            if not hmac.compare_digest(signature.encode(), self._sign(f"{user}.{expires}").encode()):
+                return None
+            if int(expires) < time.time():
+                return None
+            return _unb64(user).decode()
+        except (ValueError, TypeError):
+            return None
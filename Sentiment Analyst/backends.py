@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import torch
+
+# INFERENCE_BACKEND values understood by load_backend
+BACKENDS = ("torch", "quantized", "onnx", "onnx-int8")
+
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model.eval()
+
+    def logits(self, input_ids, attention_mask):
+        with torch.inference_mode():
+            return self.model(input_ids=torch.from_numpy(input_ids),
+                              attention_mask=torch.from_numpy(attention_mask)).logits.float().numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """fp32 model with its Linear layers dynamically quantized to int8."""
+
+    name = "quantized"
+
+    def __init__(self, model):
+        super().__init__(torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8))
+
+
+class OnnxBackend:
+    """ONNX Runtime session over a file written by export_model.py."""
+
+    def __init__(self, path, name="onnx", threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.name = name
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def logits(self, input_ids, attention_mask):
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        return self.session.run(["logits"], feeds)[0]
+
+
+def load_backend(kind, model, onnx_dir, threads=None):
+    if kind == "torch":
+        return TorchBackend(model)
+    if kind == "quantized":
+        return QuantizedTorchBackend(model)
+    if kind in ONNX_FILES:
+        path = os.path.join(onnx_dir, ONNX_FILES[kind])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found. Run: python export_model.py")
+        return OnnxBackend(path, name=kind, threads=threads)
+    raise ValueError(f"Unknown inference backend {kind!r}; expected one of {', '.join(BACKENDS)}.")
@@ -0,0 +1,100 @@
+# /analyze latency while a storm of logins hits the server: bcrypt on the event loop
+# (the old /login) versus bcrypt on the hashing thread pool (the current /login).
+# Runs the app in-process over httpx's ASGI transport with a throwaway database.
+# Usage: python benchmarks/bench_auth.py [--analyze 200] [--logins 40] [--rounds 12]
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else float("nan")
+
+
+async def analyze_load(client, token, n, concurrency, tag):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            start = time.perf_counter()
+            res = await client.post("/analyze", json={"movie": "M", "review": f"{tag} review number {i}",
+                                                      "explain": False},
+                                    headers={"Authorization": f"Bearer {token}"})
+            res.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return latencies
+
+
+async def login_storm(client, path, n, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            res = await client.post(path, json={"username": "bench", "password": "secret-password"})
+            res.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return n / (time.perf_counter() - start)
+
+
+async def run(args):
+    import httpx
+    import main
+
+    @main.app.post("/login-inline")
+    async def login_inline(user: main.UserAuth):
+        # The pre-thread-pool behaviour: bcrypt runs on the event loop
+        db_user = main.db.get_user(user.username)
+        if not (db_user and main.hasher.context.verify(user.password, db_user["hashed_password"])):
+            raise main.HTTPException(status_code=401)
+        return {"token": main.sessions.issue(user.username)}
+
+    await main.engine.run(main.models.warmup)
+    if main.models.error:
+        sys.exit(main.models.error)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        await client.post("/signup", json={"username": "bench", "password": "secret-password"})
+        token = (await client.post("/login", json={"username": "bench", "password": "secret-password"})).json()["token"]
+
+        print(f"{'scenario':>22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'logins/s':>9}")
+        for name, path in (("analyze only", None), ("storm, inline bcrypt", "/login-inline"),
+                           ("storm, bcrypt pool", "/login")):
+            tasks = [analyze_load(client, token, args.analyze, args.concurrency, name)]
+            if path:
+                tasks.append(login_storm(client, path, args.logins, args.concurrency))
+            results = await asyncio.gather(*tasks)
+            latencies = results[0]
+            rate = f"{results[1]:>9.1f}" if path else f"{'-':>9}"
+            print(f"{name:>22} {pct(latencies, 0.5):>8.1f} {pct(latencies, 0.95):>8.1f} "
+                  f"{pct(latencies, 0.99):>8.1f} {rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--analyze", type=int, default=200, help="/analyze calls per scenario")
+    parser.add_argument("--logins", type=int, default=40, help="logins in the storm")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DB_PATH=os.path.join(tmp, "bench.db"), CACHE_DISK="0",
+                          BCRYPT_ROUNDS=str(args.rounds), SESSION_SECRET="bench")
+        os.chdir(APP_DIR)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Concurrent read/write load against DatabaseManager, compared with the old
+# connection-per-call behaviour.
+# Usage: python benchmarks/bench_db.py [--threads 8] [--ops 2000] [--write-ratio 0.2]
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+
+class PerCallDatabaseManager(DatabaseManager):
+    """The original access pattern: a new rollback-journal connection per call, never closed."""
+
+    def connection(self):
+        conn = sqlite3.connect(self.db_path)
+        self._configure(conn)
+        return conn
+
+
+def seed(db, users, reviews_per_user):
+    for u in range(users):
+        db.create_user(f"user{u}", "x")
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO reviews (owner, date, movie, sentiment, confidence) VALUES (?, ?, ?, ?, ?)",
+                         [(f"user{u}", "2026-01-01 12:00", f"Movie {i}", "POSITIVE", 0.9)
+                          for u in range(users) for i in range(reviews_per_user)])
+
+
+def worker(db, ops, write_ratio, users, latencies, errors, seed_value):
+    rng = random.Random(seed_value)
+    for _ in range(ops):
+        user = f"user{rng.randrange(users)}"
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                db.save_review(user, "2026-01-02 12:00", "Bench", "NEGATIVE", 0.55)
+                kind = "write"
+            else:
+                db.get_user(user)
+                db.get_history(user)
+                kind = "read"
+        except sqlite3.OperationalError:
+            errors.append(1)
+            continue
+        latencies[kind].append(time.perf_counter() - start)
+
+
+def run(cls, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = cls(os.path.join(tmp, "bench.db"))
+        seed(db, args.users, args.reviews_per_user)
+        latencies = {"read": [], "write": []}
+        errors = []
+        threads = [threading.Thread(target=worker, args=(db, args.ops, args.write_ratio, args.users,
+                                                         latencies, errors, i))
+                   for i in range(args.threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        if isinstance(db, DatabaseManager):
+            db.close()
+
+    def pct(values, p):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else float("nan")
+
+    done = len(latencies["read"]) + len(latencies["write"])
+    print(f"{cls.__name__:>24} {done / elapsed:>9.0f} "
+          f"{pct(latencies['read'], 0.5):>9.2f} {pct(latencies['read'], 0.95):>9.2f} "
+          f"{pct(latencies['write'], 0.5):>9.2f} {pct(latencies['write'], 0.95):>9.2f} {len(errors):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=2000, help="operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--reviews-per-user", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'implementation':>24} {'ops/s':>9} {'read p50':>9} {'read p95':>9} "
+          f"{'write p50':>9} {'write p95':>9} {'errors':>7}  (latencies in ms)")
+    for cls in (PerCallDatabaseManager, DatabaseManager):
+        run(cls, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Compares the original pipeline-based LIME path with FastExplainer.
+# Usage: python benchmarks/bench_explain.py [--model ./sentiment-model] [--samples 100 500 1000]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from lime.lime_text import LimeTextExplainer
+from transformers import pipeline
+
+from explanation import FastExplainer
+from inference import SequenceClassifier
+
+REVIEW = ("The first half drags and the dialogue is clumsy, but the final act is "
+          "genuinely moving and the lead performance carries the whole film.")
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="vleramm/sentiment-model")
+    parser.add_argument("--samples", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    clf = pipeline("sentiment-analysis", model=args.model, top_k=None)
+    classifier = SequenceClassifier(clf.model, clf.tokenizer)
+    fast = FastExplainer(classifier)
+    lime = LimeTextExplainer(class_names=classifier.labels)
+
+    # Same conversion ModelService.pipeline_proba does
+    def predict_probs(texts):
+        probs = []
+        for out in clf(texts):
+            sorted_out = sorted(out, key=lambda x: x['label'])
+            probs.append([sorted_out[0]['score'], sorted_out[1]['score']])
+        return np.array(probs)
+
+    perturbed = [" ".join(REVIEW.split()[i:]) for i in range(20)]
+    drift = np.abs(predict_probs(perturbed) - classifier.predict_proba(perturbed)).max()
+    print(f"max |pipeline - fast| probability difference: {drift:.2e}\n")
+
+    probs = classifier.predict_proba([REVIEW])[0]
+    print(f"{'num_samples':>12} {'pipeline (s)':>14} {'fast (s)':>10} {'speedup':>8}")
+    for n in args.samples:
+        slow = timed(lambda: lime.explain_instance(REVIEW, predict_probs, num_features=10, num_samples=n), args.repeat)
+        quick = timed(lambda: fast.explain(REVIEW, probs, num_features=10, num_samples=n), args.repeat)
+        print(f"{n:>12} {slow:>14.3f} {quick:>10.3f} {slow / quick:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Throughput and memory of the multi-process inference pool for a growing number of
+# workers, compared with the single in-process model. Memory is the summed PSS of the
+# worker processes (shared pages are split between the processes mapping them).
+# Usage: python benchmarks/bench_pool.py [--workers 1 2 4] [--texts 2000] [--model ./sentiment-model]
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_loader import LOCAL_DIR, ModelService
+from worker_pool import InferencePool
+
+REVIEWS = [
+    "An absolute delight from start to finish, the cast is wonderful.",
+    "Two hours I will never get back. Flat characters and a plot full of holes.",
+    "It was fine. Not great, not terrible, the soundtrack carried it.",
+    "The director's best work yet: bold, funny and surprisingly moving, with a final act that "
+    "ties every thread together and leaves you thinking about it for days.",
+]
+
+
+def memory_kb(pids):
+    total = {"Rss": 0, "Pss": 0}
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key = line.split(":")[0]
+                if key in total:
+                    total[key] += int(line.split()[1])
+    return total
+
+
+def throughput(predict_proba, texts, batch_size, concurrency):
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        list(ex.map(predict_proba, batches))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=LOCAL_DIR)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+    texts = [REVIEWS[i % len(REVIEWS)] for i in range(args.texts)]
+
+    print(f"{'mode':>12} {'texts/s':>9} {'speedup':>8} {'RSS MB':>8} {'PSS MB':>8}")
+    service = ModelService(args.model)
+    base = throughput(service.classifier.predict_proba, texts, args.batch_size, 1)
+    mem = memory_kb([os.getpid()])
+    print(f"{'in-process':>12} {base:>9.0f} {1:>8.2f} {mem['Rss'] / 1024:>8.0f} {mem['Pss'] / 1024:>8.0f}")
+    for workers in args.workers:
+        pool = InferencePool(args.model, workers, threads=1)
+        pool.warmup()
+        if pool.error:
+            sys.exit(pool.error)
+        rate = throughput(pool.classifier.predict_proba, texts, args.batch_size, workers)
+        mem = memory_kb([p.pid for p in pool._pool._pool])
+        print(f"{f'{workers} workers':>12} {rate:>9.0f} {rate / base:>8.2f} "
+              f"{mem['Rss'] / 1024:>8.0f} {mem['Pss'] / 1024:>8.0f}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Cold-start cost of the API in a fresh interpreter: `import main`, time until /ready,
+# and the first /analyze round trip. --record appends the result as a JSON line so
+# runs can be compared over time.
+# Usage: python benchmarks/bench_startup.py [--runs 3] [--record startup.jsonl]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    while client.get("/ready").status_code == 503 and main.models.error is None:
+        time.sleep(0.01)
+    ready = time.perf_counter() - start
+    client.post("/signup", json={"username": "bench", "password": "bench"})
+    token = client.post("/login", json={"username": "bench", "password": "bench"}).json()["token"]
+    t = time.perf_counter()
+    response = client.post("/analyze", json={"movie": "M", "review": "A first review.", "explain": False},
+                           headers={"Authorization": f"Bearer {token}"})
+    first = time.perf_counter() - t
+    assert response.status_code == 200, response.text
+print(json.dumps({"import_s": imported, "ready_s": ready, "first_analyze_s": first,
+                  "error": main.models.error, **{"model_" + k: v for k, v in main.models.timings.items()}}))
+'''
+
+
+def run_once(env):
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=APP_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--record", help="append the medians to this JSON lines file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DB_PATH=os.path.join(tmp, "bench.db"), CACHE_DISK="0")
+        for i in range(args.runs):
+            result = run_once(env)
+            if result["error"]:
+                sys.exit(f"Model failed to load: {result['error']}")
+            results.append(result)
+            print(f"run {i + 1}: import {result['import_s']:.2f}s, ready {result['ready_s']:.2f}s, "
+                  f"first /analyze {result['first_analyze_s'] * 1000:.0f}ms")
+
+    keys = [k for k in results[0] if k != "error"]
+    medians = {k: statistics.median(r[k] for r in results) for k in keys}
+    print("\nmedian over", args.runs, "runs (seconds)")
+    for k, v in medians.items():
+        print(f"{k:>28} {v:>8.3f}")
+    if args.record:
+        with open(args.record, "a") as f:
+            f.write(json.dumps({"time": time.strftime("%Y-%m-%d %H:%M"), "runs": args.runs, **medians}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
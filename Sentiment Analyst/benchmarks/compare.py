@@ -0,0 +1,39 @@
+# Flags regressions between two results files written by micro.py or load.py.
+# Exits with status 1 when any case got slower (p95), leaner in throughput or heavier in
+# peak RSS by more than --threshold.
+# Usage: python benchmarks/compare.py before.json after.json [--threshold 0.10]
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from results import compare, load
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change tolerated")
+    parser.add_argument("--min-ms", type=float, default=0.1, help="ignore p95 changes smaller than this")
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    print(f"before: {before['meta'].get('commit')} {before['meta']['time']}   "
+          f"after: {after['meta'].get('commit')} {after['meta']['time']}\n")
+    rows = compare(before, after, args.threshold, args.min_ms)
+    print(f"{'case':<44} {'metric':>12} {'before':>11} {'after':>11} {'change':>8}")
+    for name, metric, a, b, change, regressed in rows:
+        flag = "  ❌ regression" if regressed else ""
+        print(f"{name:<44} {metric:>12} {a:>11.2f} {b:>11.2f} {change:>+8.1%}{flag}")
+    missing = {r["name"] for r in before["results"]} - {r["name"] for r in after["results"]}
+    if missing:
+        print(f"\nnot in the second run: {', '.join(sorted(missing))}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# HTTP load test of the whole stack: concurrent clients mix /analyze, /history and /login
+# against the app running in-process (httpx ASGI transport, lifespan warm-up included),
+# with the local model and a throwaway database. The client shares the process, so
+# absolute numbers are a lower bound; compare runs made with the same arguments.
+# Usage: python benchmarks/load.py [--clients 16] [--duration 30] [--mix analyze=6 history=3 login=1]
+#                                  [-o results.json]
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from micro import REVIEWS
+from results import print_table, save, summarize
+
+PASSWORD = "load-test-password"
+
+
+async def client_loop(client, user, token, mix, deadline, latencies, errors, rng):
+    endpoints, weights = zip(*mix.items())
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        start = time.perf_counter()
+        if endpoint == "analyze":
+            # A random suffix keeps most calls out of the prediction cache
+            review = f"{rng.choice(REVIEWS)} #{rng.randrange(10 ** 9)}"
+            res = await client.post("/analyze", json={"movie": "Load", "review": review, "explain": False},
+                                    headers=headers)
+        elif endpoint == "history":
+            res = await client.get(f"/history/{user}", params={"limit": 200}, headers=headers)
+        else:
+            res = await client.post("/login", json={"username": user, "password": PASSWORD})
+        latencies[endpoint].append(time.perf_counter() - start)
+        if res.status_code != 200:
+            errors[endpoint] += 1
+
+
+async def run(args):
+    import httpx
+    import main
+
+    mix = dict(item.split("=") for item in args.mix)
+    mix = {k: float(v) for k, v in mix.items()}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://load", timeout=600) as client:
+        while not main.models.ready:
+            if main.models.error:
+                sys.exit(main.models.error)
+            await asyncio.sleep(0.05)
+        tokens = {}
+        for i in range(args.clients):
+            user = f"load{i}"
+            await client.post("/signup", json={"username": user, "password": PASSWORD})
+            tokens[user] = (await client.post("/login", json={"username": user, "password": PASSWORD})).json()["token"]
+            # Give every user some history to page through
+            for j in range(args.history_rows // 50):
+                await client.post("/analyze/batch", json={"reviews": [{"movie": "Seed", "review": f"{REVIEWS[k % 4]} {j}"}
+                                                                      for k in range(50)]},
+                                  headers={"Authorization": f"Bearer {tokens[user]}"})
+
+        latencies = {endpoint: [] for endpoint in mix}
+        errors = {endpoint: 0 for endpoint in mix}
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(client_loop(client, user, token, mix, deadline, latencies, errors, random.Random(i))
+                               for i, (user, token) in enumerate(tokens.items())))
+        elapsed = time.perf_counter() - start
+
+    results = [summarize(f"load /{endpoint} c={args.clients}", values, elapsed=elapsed, unit="req")
+               for endpoint, values in latencies.items() if values]
+    results.append(summarize(f"load total c={args.clients}", sum(latencies.values(), []), elapsed=elapsed, unit="req"))
+    print_table(results)
+    if any(errors.values()):
+        print(f"⚠️ non-200 responses: {errors}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load after the warm-up")
+    parser.add_argument("--mix", nargs="+", default=["analyze=6", "history=3", "login=1"],
+                        help="endpoint=weight pairs (analyze, history, login)")
+    parser.add_argument("--history-rows", type=int, default=500, help="reviews seeded per user")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--model", help="MODEL_PATH for the app (default: its own resolution)")
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DB_PATH=os.path.join(tmp, "load.db"), CACHE_DISK="0",
+                          BCRYPT_ROUNDS=str(args.rounds), SESSION_SECRET="load-test")
+        if args.model:
+            os.environ["MODEL_PATH"] = args.model
+        os.chdir(APP_DIR)
+        results = asyncio.run(run(args))
+    if args.output:
+        save(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
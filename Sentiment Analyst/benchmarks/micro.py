@@ -0,0 +1,132 @@
+# Microbenchmarks: model calls, LIME and every DatabaseManager method.
+# Usage: python benchmarks/micro.py [--model ./sentiment-model] [--db-sizes 10000 100000 1000000]
+#                                   [--only model db] [-o results.json]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from model_loader import ModelService, resolve_model_path
+from results import measure, print_table, save
+
+REVIEWS = [
+    "An absolute delight from start to finish, the cast is wonderful.",
+    "Two hours I will never get back. Flat characters and a plot full of holes.",
+    "It was fine. Not great, not terrible, the soundtrack carried it.",
+    "The first half drags and the dialogue is clumsy, but the final act is genuinely moving "
+    "and the lead performance carries the whole film.",
+]
+
+
+def model_cases(args):
+    service = ModelService(args.model)
+    classifier = service.classifier
+    texts = [REVIEWS[i % len(REVIEWS)] + f" ({i})" for i in range(args.batch)]
+    results = [
+        # The pipeline path the "lime" explainer uses (formerly main.predict_probs)
+        measure(f"pipeline_proba x{args.batch}", lambda: service.pipeline_proba(texts), args.repeat,
+                items_per_call=len(texts), unit="texts"),
+        measure("classifier single x1", lambda: classifier.predict_proba(texts[:1]), args.repeat * 10,
+                unit="texts"),
+        measure(f"classifier looped x{args.batch}", lambda: [classifier.predict_proba([t]) for t in texts],
+                args.repeat, items_per_call=len(texts), unit="texts"),
+        measure(f"classifier batched x{args.batch}", lambda: classifier.predict_proba(texts), args.repeat,
+                items_per_call=len(texts), unit="texts"),
+    ]
+    probs = classifier.predict_proba(REVIEWS[3:4])[0]
+    for n in args.lime_samples:
+        for method in ("fast", "lime"):
+            results.append(measure(f"explain {method} num_samples={n}",
+                                   lambda: service.explain_html(REVIEWS[3], probs if method == "fast" else None,
+                                                                method, num_samples=n),
+                                   args.lime_repeat, unit="explanations"))
+    return results
+
+
+def seed(db, size, users):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for u in range(users):
+        db.create_user(f"user{u}", "x")
+    chunk = 50000
+    for offset in range(0, size, chunk):
+        db.save_reviews([(f"user{rng.randrange(users)}",
+                          f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00",
+                          f"Movie {rng.randrange(5000)}", rng.choice(("POSITIVE", "NEGATIVE")), rng.random(),
+                          rng.choice(REVIEWS))
+                         for _ in range(offset, min(size, offset + chunk))])
+    print(f"🌱 seeded {size} reviews for {users} users in {time.perf_counter() - start:.1f}s")
+
+
+def db_cases(args, size):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        seed(db, size, args.users)
+        rng = random.Random(1)
+        user = lambda: f"user{rng.randrange(args.users)}"
+        with db.connection() as conn:
+            max_id = conn.execute("SELECT MAX(id) FROM reviews").fetchone()[0]
+            # (id, owner) pairs so updates and deletes hit real rows
+            owned = conn.execute("SELECT id, owner FROM reviews ORDER BY random() LIMIT ?",
+                                 (args.db_repeat * 2 + 2,)).fetchall()
+        rows = iter(owned)
+        label = f"db {size // 1000}k"
+        counter = iter(range(10 ** 9))
+        cases = {
+            "get_user": lambda: db.get_user(user()),
+            "create_user": lambda: db.create_user(f"new{next(counter)}", "x"),
+            "save_review": lambda: db.save_review(user(), "2026-06-01 12:00", "Bench", "POSITIVE", 0.9, REVIEWS[0]),
+            "save_reviews x100": lambda: db.save_reviews([(user(), "2026-06-01 12:00", "Bench", "NEGATIVE", 0.6,
+                                                           REVIEWS[1])] * 100),
+            "get_history limit=200": lambda: db.get_history(user(), limit=200),
+            "get_history all": lambda: db.get_history(user()),
+            "get_history since_id": lambda: db.get_history(user(), since_id=max_id - 100),
+            "get_stats month": lambda: db.get_stats(user(), "month"),
+            "get_movie_stats": lambda: db.get_movie_stats(f"movie {rng.randrange(5000)}"),
+            "search title": lambda: db.search(user(), f"Movie {rng.randrange(5000)}"),
+            "search text": lambda: db.search(user(), "soundtrack"),
+            # A common word from a user with no reviews: the owner token should make this cheap
+            "search text, empty diary": lambda: db.search("nobody", "soundtrack"),
+            "update_review": lambda: db.update_review(*next(rows), "X", "POSITIVE", 0.7),
+            "delete_review": lambda: db.delete_review(*next(rows)),
+        }
+        for name, fn in cases.items():
+            repeat = args.db_repeat // 10 if name == "get_history all" else args.db_repeat
+            results.append(measure(f"{label} {name}", fn, max(1, repeat), unit="queries"))
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=resolve_model_path(None))
+    parser.add_argument("--only", nargs="+", choices=["model", "db"], default=["model", "db"])
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--lime-samples", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--lime-repeat", type=int, default=3)
+    parser.add_argument("--db-sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--db-repeat", type=int, default=500)
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args()
+
+    results = []
+    if "model" in args.only:
+        results += model_cases(args)
+    if "db" in args.only:
+        for size in args.db_sizes:
+            results += db_cases(args, size)
+    print_table(results)
+    if args.output:
+        save(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
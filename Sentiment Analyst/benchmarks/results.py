@@ -0,0 +1,101 @@
+# Shared results format for micro.py and load.py, and the regression check behind compare.py.
+#
+# A results file is JSON:
+#   {"meta": {"time", "commit", "python", "cpus", "argv"},
+#    "results": [{"name", "n", "p50_ms", "p95_ms", "p99_ms", "throughput", "unit", "peak_rss_mb"}]}
+# `throughput` is `unit`s per second (requests, texts, queries...). `peak_rss_mb` is the
+# process high-water mark when the case finished, so it only grows within one run.
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def summarize(name, latencies, elapsed=None, items=None, unit="calls"):
+    """Latencies in seconds -> one result row. Throughput is items (default: calls) / elapsed."""
+    ms = np.asarray(latencies) * 1000
+    elapsed = elapsed if elapsed is not None else float(np.sum(latencies))
+    items = items if items is not None else len(latencies)
+    return {
+        "name": name,
+        "n": len(latencies),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "throughput": items / elapsed if elapsed else 0.0,
+        "unit": unit,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure(name, fn, repeat, items_per_call=1, unit="calls", warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(name, latencies, items=items_per_call * repeat, unit=unit)
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(results):
+    print(f"{'case':<44} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'throughput':>22} {'RSS MB':>7}")
+    for r in results:
+        rate = f"{r['throughput']:.1f} {r['unit']}/s"
+        print(f"{r['name']:<44} {r['n']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{rate:>22} {r['peak_rss_mb']:>7.0f}")
+
+
+def save(path, results):
+    meta = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": _commit(), "python": platform.python_version(),
+            "cpus": os.cpu_count(), "argv": sys.argv}
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\n💾 {len(results)} results -> {path}")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(before, after, threshold=0.10, min_ms=0.1):
+    """Rows of (name, metric, before, after, change, regressed) for cases present in both runs.
+
+    A regression is p95 latency or peak RSS growing, or throughput shrinking, by more
+    than `threshold` (relative). p95 changes under `min_ms` are treated as noise.
+    """
+    old = {r["name"]: r for r in before["results"]}
+    rows = []
+    for new in after["results"]:
+        base = old.get(new["name"])
+        if base is None:
+            continue
+        for metric, higher_is_worse in (("p95_ms", True), ("throughput", False), ("peak_rss_mb", True)):
+            a, b = base[metric], new[metric]
+            change = (b - a) / a if a else 0.0
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            if metric == "p95_ms" and abs(b - a) < min_ms:
+                regressed = False
+            rows.append((new["name"], metric, a, b, change, regressed))
+    return rows
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def length_batches(lengths, batch_size, shuffle=False, seed=0, megabatch=50):
+    """Groups indices into batches of similar length.
+
+    Without shuffling every index is sorted by length (inference). With
+    shuffling, indices are randomly split into megabatches of `megabatch`
+    batches, each sorted by length, and the resulting batches shuffled, so
+    training order stays random while padding stays low.
+    """
+    lengths = np.asarray(lengths)
+    if not shuffle:
+        order = np.argsort(lengths, kind="stable")
+        return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(lengths))
+    size = batch_size * megabatch
+    batches = []
+    for start in range(0, len(order), size):
+        chunk = order[start:start + size]
+        chunk = chunk[np.argsort(-lengths[chunk], kind="stable")]
+        batches.extend(chunk[i:i + batch_size] for i in range(0, len(chunk), batch_size))
+    rng.shuffle(batches)
+    return batches
+
+
+def padding_ratio(lengths, batches):
+    """Fraction of the padded tensor area that is padding."""
+    lengths = np.asarray(lengths)
+    real = sum(int(lengths[b].sum()) for b in batches)
+    padded = sum(int(lengths[b].max()) * len(b) for b in batches)
+    return 1 - real / padded if padded else 0.0
+
+
+class LengthBucketSampler:
+    """Yields dataset indices so that consecutive `batch_size` runs have similar lengths.
+
+    A new random grouping is drawn every epoch. DataLoader accepts any sized
+    iterable as a sampler, so this stays importable without torch.
+    """
+
+    def __init__(self, lengths, batch_size, seed=0):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self):
+        batches = length_batches(self.lengths, self.batch_size, shuffle=True, seed=self.seed + self.epoch)
+        self.epoch += 1
+        for batch in batches:
+            yield from batch.tolist()
+
+    def __len__(self):
+        return len(self.lengths)
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_utils import normalize_columns
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def read_reviews_csv(source):
+    """Letterboxd / IMDb / Kaggle style CSV -> DataFrame with text, movie and date columns."""
+    df = normalize_columns(pd.read_csv(source), required=("text",), optional=("movie", "date"))
+    df = df[df["text"].str.len() > 0]
+    if "movie" not in df.columns:
+        df["movie"] = ""
+    df["movie"] = df["movie"].fillna("").astype(str)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime(DATE_FORMAT)
+    else:
+        df["date"] = None
+    return df.reset_index(drop=True)
+
+
+def score_and_save(db, classifier, owner, movies, texts, dates=None):
+    """Scores every text in padded batches and stores all rows in one transaction."""
+    return save_scored(db, classifier.labels, owner, movies, texts, classifier.predict_proba(texts), dates)
+
+
+def save_scored(db, labels, owner, movies, texts, probs, dates=None):
+    """Stores already scored texts (`probs`: one row of class probabilities each) in one transaction."""
+    probs = np.asarray(probs)
+    best = probs.argmax(axis=1)
+    scores = probs[np.arange(len(texts)), best]
+    now = datetime.now().strftime(DATE_FORMAT)
+    rows = [(owner, (dates[i] if dates is not None and isinstance(dates[i], str) else now),
+             movies[i], labels[best[i]], float(scores[i]), texts[i])
+            for i in range(len(texts))]
+    db.save_reviews(rows)
+    return [{"movie": movie, "sentiment": label, "confidence": f"{score:.2%}"}
+            for _, _, movie, label, score, _ in rows]
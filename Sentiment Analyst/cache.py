@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+def model_revision(model_path):
+    """Fingerprint of a local model directory (file names, sizes, mtimes); hub ids are used as-is."""
+    if not os.path.isdir(model_path):
+        return model_path
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(model_path)):
+        full = os.path.join(model_path, name)
+        if os.path.isfile(full):
+            stat = os.stat(full)
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+class PredictionCache:
+    """Two-tier cache for model outputs keyed by normalized text and model revision.
+
+    The memory tier is an LRU bounded by `max_entries` and `max_bytes`; the
+    optional disk tier is a table in the `DatabaseManager` file, bounded per
+    revision by `max_disk_entries` and `max_disk_bytes`. Sizes are those of the
+    JSON-encoded values. Entries expire after `ttl` seconds. Values must be JSON-serializable and
+    live in separate namespaces (e.g. "prediction", "explanation:fast").
+    When the files in `model_path` change, the entries of the old revision
+    are dropped. `variant` (e.g. the inference backend) keeps outputs of
+    differently executed copies of the same model apart. Several processes
+    with different revisions (the API, infer_demo.py) can share one disk
+    table; each only ever deletes its own revision's rows and expired ones.
+    """
+
+    def __init__(self, model_path, max_entries=10000, ttl=24 * 3600, db=None,
+                 max_disk_entries=200000, check_interval=5.0, variant="",
+                 max_bytes=64 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.model_path = model_path
+        self.variant = variant
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db = db
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.check_interval = check_interval
+        self.revision = self._revision()
+        self.hits = {}
+        self.misses = {}
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._writes = 0
+        if db is not None:
+            self._init_disk()
+
+    def _init_disk(self):
+        with self.db.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS prediction_cache
+                            (key TEXT PRIMARY KEY, revision TEXT, value TEXT, expires REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prediction_cache_revision ON prediction_cache (revision)")
+            conn.execute("DELETE FROM prediction_cache WHERE expires < ?", (time.time(),))
+
+    def _revision(self):
+        revision = model_revision(self.model_path)
+        return f"{revision}:{self.variant}" if self.variant else revision
+
+    def _key(self, namespace, text):
+        raw = f"{self.revision}\0{namespace}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _check_revision(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        revision = self._revision()
+        if revision != self.revision:
+            self._clear()
+            self.revision = revision
+
+    def get(self, namespace, text):
+        with self._lock:
+            self._check_revision()
+            key = self._key(namespace, text)
+            value = self._get_memory(key)
+            if value is None and self.db is not None:
+                encoded = self._get_disk(key)
+                if encoded is not None:
+                    value = json.loads(encoded)
+                    self._set_memory(key, value, len(encoded))
+            counter = self.hits if value is not None else self.misses
+            counter[namespace] = counter.get(namespace, 0) + 1
+            return value
+
+    def set(self, namespace, text, value, revision=None):
+        """`revision`: the one `value` was computed under (read before computing it).
+
+        Writes for an older revision are dropped, so output of a model that was
+        swapped out mid-computation never lands under its successor's revision.
+        """
+        with self._lock:
+            if revision is not None and revision != self.revision:
+                return
+            key = self._key(namespace, text)
+            encoded = json.dumps(value)
+            self._set_memory(key, value, len(encoded))
+            if self.db is not None:
+                self._set_disk(key, encoded)
+
+    def _get_memory(self, key):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires, value, size = entry
+        if expires < time.time():
+            del self._memory[key]
+            self._memory_bytes -= size
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _set_memory(self, key, value, size):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+        self._memory[key] = (time.time() + self.ttl, value, size)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            self._memory_bytes -= self._memory.popitem(last=False)[1][2]
+
+    def _get_disk(self, key):
+        with self.db.connection() as conn:
+            row = conn.execute("SELECT value FROM prediction_cache WHERE key = ? AND expires >= ?",
+                               (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def _set_disk(self, key, encoded):
+        with self.db.connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO prediction_cache (key, revision, value, expires) VALUES (?, ?, ?, ?)",
+                         (key, self.revision, encoded, time.time() + self.ttl))
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._prune_disk(conn)
+
+    def _prune_disk(self, conn):
+        conn.execute("DELETE FROM prediction_cache WHERE expires < ?", (time.time(),))
+        # Newest first; rows past either cap go. Other revisions' rows are left to their owners
+        conn.execute("""DELETE FROM prediction_cache WHERE key IN
+                        (SELECT key FROM (SELECT key, ROW_NUMBER() OVER w AS n, SUM(length(value)) OVER w AS total
+                                          FROM prediction_cache WHERE revision = ?
+                                          WINDOW w AS (ORDER BY expires DESC))
+                         WHERE n > ? OR total > ?)""",
+                     (self.revision, self.max_disk_entries, self.max_disk_bytes))
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def switch(self, model_path, variant=""):
+        """Starts caching for another model (e.g. after a hot swap); old entries are dropped."""
+        with self._lock:
+            self._clear()
+            self.model_path = model_path
+            self.variant = variant
+            self.revision = self._revision()
+
+    def _clear(self):
+        # Only the current revision's rows; other processes may be using theirs
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self.db is not None:
+            with self.db.connection() as conn:
+                conn.execute("DELETE FROM prediction_cache WHERE revision = ?", (self.revision,))
+
+    def stats(self):
+        namespaces = set(self.hits) | set(self.misses)
+        return {
+            "revision": self.revision,
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+            "namespaces": {ns: {"hits": self.hits.get(ns, 0), "misses": self.misses.get(ns, 0)}
+                           for ns in sorted(namespaces)},
+        }
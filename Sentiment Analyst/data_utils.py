@@ -0,0 +1,25 @@
+# Column names accepted for each field in uploaded / Kaggle CSVs (matched case-insensitively)
+COLUMN_ALIASES = {
+    "text": ("text", "review"),
+    "label": ("label", "sentiment"),
+    "movie": ("movie", "title", "name", "film"),
+    "date": ("date", "watched date"),
+}
+
+def normalize_columns(df, required=("text", "label"), optional=()):
+    """Keep only the known columns of `df`, renamed to their canonical names."""
+    cols = {c.lower().strip(): c for c in df.columns}
+    found = {}
+    for name in (*required, *optional):
+        source = next((cols[alias] for alias in COLUMN_ALIASES[name] if alias in cols), None)
+        if source is not None:
+            found[source] = name
+        elif name in required:
+            wanted = " and ".join(f"'{COLUMN_ALIASES[n][0]}' (or '{COLUMN_ALIASES[n][1]}')" for n in required)
+            raise ValueError(f"CSV must contain {wanted}.")
+
+    df = df[list(found)].rename(columns=found)
+    if "text" in df.columns:
+        df = df.dropna(subset=["text"])
+        df["text"] = df["text"].astype(str).str.strip()
+    return df
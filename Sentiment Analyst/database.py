@@ -1,49 +1,446 @@
+import re
 import sqlite3
+import threading
+import unicodedata
+
+from metrics import DB_SECONDS
+
+# Applied to every pooled connection. WAL lets readers run alongside the single
+# writer; NORMAL sync is durable across app crashes (only an OS crash can lose
+# the last commits) and avoids an fsync per transaction.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",     # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",   # map up to 256 MB of the file
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Schema changes applied in order by init_db. PRAGMA user_version records how
+# many have already run, so each one executes exactly once per database file.
+MIGRATIONS = [
+    # 1: history lookups filter by owner and page by id
+    ["CREATE INDEX IF NOT EXISTS idx_reviews_owner_id ON reviews (owner, id)"],
+    # 2: confidence becomes a REAL fraction ("97.12%" -> 0.9712) so SQL can aggregate it
+    [
+        """CREATE TABLE reviews_new
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner TEXT, date TEXT, movie TEXT, sentiment TEXT, confidence REAL)""",
+        """INSERT INTO reviews_new (id, owner, date, movie, sentiment, confidence)
+           SELECT id, owner, date, movie, sentiment,
+                  CASE WHEN instr(confidence, '%') > 0
+                       THEN ROUND(CAST(RTRIM(confidence, '%') AS REAL) / 100, 6)
+                       ELSE CAST(confidence AS REAL) END
+           FROM reviews""",
+        "DROP TABLE reviews",
+        "ALTER TABLE reviews_new RENAME TO reviews",
+        "CREATE INDEX idx_reviews_owner_id ON reviews (owner, id)",
+    ],
+    # 3: per-user counters behind /stats, kept in step with `reviews` by triggers
+    # (same transaction as the write) so the dashboard never scans a history.
+    # Confidence buckets are ten bins of width 0.1.
+    [
+        """CREATE TABLE review_stats
+           (owner TEXT, sentiment TEXT, bucket INTEGER, count INTEGER NOT NULL, confidence_sum REAL NOT NULL,
+            PRIMARY KEY (owner, sentiment, bucket)) WITHOUT ROWID""",
+        """CREATE TABLE review_daily
+           (owner TEXT, day TEXT, sentiment TEXT, count INTEGER NOT NULL,
+            PRIMARY KEY (owner, day, sentiment)) WITHOUT ROWID""",
+        """INSERT INTO review_stats (owner, sentiment, bucket, count, confidence_sum)
+           SELECT owner, sentiment, MIN(CAST(confidence * 10 AS INTEGER), 9), COUNT(*), SUM(confidence)
+           FROM reviews GROUP BY 1, 2, 3""",
+        """INSERT INTO review_daily (owner, day, sentiment, count)
+           SELECT owner, substr(date, 1, 10), sentiment, COUNT(*) FROM reviews GROUP BY 1, 2, 3""",
+        """CREATE TRIGGER reviews_stats_insert AFTER INSERT ON reviews BEGIN
+               INSERT INTO review_stats (owner, sentiment, bucket, count, confidence_sum)
+               VALUES (NEW.owner, NEW.sentiment, MIN(CAST(NEW.confidence * 10 AS INTEGER), 9), 1, NEW.confidence)
+               ON CONFLICT (owner, sentiment, bucket) DO UPDATE
+               SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum;
+               INSERT INTO review_daily (owner, day, sentiment, count)
+               VALUES (NEW.owner, substr(NEW.date, 1, 10), NEW.sentiment, 1)
+               ON CONFLICT (owner, day, sentiment) DO UPDATE SET count = count + 1;
+           END""",
+        """CREATE TRIGGER reviews_stats_delete AFTER DELETE ON reviews BEGIN
+               UPDATE review_stats SET count = count - 1, confidence_sum = confidence_sum - OLD.confidence
+               WHERE owner = OLD.owner AND sentiment = OLD.sentiment
+                 AND bucket = MIN(CAST(OLD.confidence * 10 AS INTEGER), 9);
+               UPDATE review_daily SET count = count - 1
+               WHERE owner = OLD.owner AND day = substr(OLD.date, 1, 10) AND sentiment = OLD.sentiment;
+           END""",
+        """CREATE TRIGGER reviews_stats_update AFTER UPDATE OF owner, date, sentiment, confidence ON reviews BEGIN
+               UPDATE review_stats SET count = count - 1, confidence_sum = confidence_sum - OLD.confidence
+               WHERE owner = OLD.owner AND sentiment = OLD.sentiment
+                 AND bucket = MIN(CAST(OLD.confidence * 10 AS INTEGER), 9);
+               UPDATE review_daily SET count = count - 1
+               WHERE owner = OLD.owner AND day = substr(OLD.date, 1, 10) AND sentiment = OLD.sentiment;
+               INSERT INTO review_stats (owner, sentiment, bucket, count, confidence_sum)
+               VALUES (NEW.owner, NEW.sentiment, MIN(CAST(NEW.confidence * 10 AS INTEGER), 9), 1, NEW.confidence)
+               ON CONFLICT (owner, sentiment, bucket) DO UPDATE
+               SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum;
+               INSERT INTO review_daily (owner, day, sentiment, count)
+               VALUES (NEW.owner, substr(NEW.date, 1, 10), NEW.sentiment, 1)
+               ON CONFLICT (owner, day, sentiment) DO UPDATE SET count = count + 1;
+           END""",
+    ],
+    # 4: a per-user version bumped by every write to that user's reviews, so
+    # clients can revalidate cached history/stats (ETag) without reading them
+    [
+        """CREATE TABLE diary_versions
+           (owner TEXT PRIMARY KEY, version INTEGER NOT NULL) WITHOUT ROWID""",
+        """INSERT INTO diary_versions (owner, version) SELECT owner, COUNT(*) FROM reviews GROUP BY owner""",
+        """CREATE TRIGGER reviews_version_insert AFTER INSERT ON reviews BEGIN
+               INSERT INTO diary_versions (owner, version) VALUES (NEW.owner, 1)
+               ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+           END""",
+        """CREATE TRIGGER reviews_version_delete AFTER DELETE ON reviews BEGIN
+               UPDATE diary_versions SET version = version + 1 WHERE owner = OLD.owner;
+           END""",
+        """CREATE TRIGGER reviews_version_update AFTER UPDATE ON reviews BEGIN
+               INSERT INTO diary_versions (owner, version) VALUES (NEW.owner, 1)
+               ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+               UPDATE diary_versions SET version = version + 1 WHERE owner = OLD.owner AND OLD.owner != NEW.owner;
+           END""",
+    ],
+    # 5: a movie dimension keyed by the canonical title (movie_key), per-movie
+    # sentiment counters kept by triggers like review_stats, the review text,
+    # and FTS5 indexes over review titles/text and movie titles. The FTS tables
+    # are external-content: they index `reviews`/`movies` without a copy. The
+    # review index also holds one owner token per review (see owner_token), so
+    # a search only walks the caller's own matches; review_terms lists the
+    # indexed words, so a typed prefix expands to exact terms (see search).
+    [
+        "ALTER TABLE reviews ADD COLUMN review TEXT",
+        "ALTER TABLE reviews ADD COLUMN movie_id INTEGER",
+        """CREATE TABLE movies
+           (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, title TEXT NOT NULL)""",
+        # The first spelling seen becomes the display title
+        """INSERT INTO movies (key, title)
+           SELECT movie_key(movie), movie FROM reviews WHERE movie_key(movie) IS NOT NULL ORDER BY id
+           ON CONFLICT (key) DO NOTHING""",
+        "UPDATE reviews SET movie_id = (SELECT id FROM movies WHERE key = movie_key(reviews.movie))",
+        "CREATE INDEX idx_reviews_owner_movie ON reviews (owner, movie_id)",
+        """CREATE TABLE movie_stats
+           (movie_id INTEGER, sentiment TEXT, count INTEGER NOT NULL, confidence_sum REAL NOT NULL,
+            PRIMARY KEY (movie_id, sentiment)) WITHOUT ROWID""",
+        """INSERT INTO movie_stats (movie_id, sentiment, count, confidence_sum)
+           SELECT movie_id, sentiment, COUNT(*), SUM(confidence) FROM reviews
+           WHERE movie_id IS NOT NULL GROUP BY 1, 2""",
+        """CREATE TRIGGER reviews_movie_insert AFTER INSERT ON reviews WHEN NEW.movie_id IS NOT NULL BEGIN
+               INSERT INTO movie_stats (movie_id, sentiment, count, confidence_sum)
+               VALUES (NEW.movie_id, NEW.sentiment, 1, NEW.confidence)
+               ON CONFLICT (movie_id, sentiment) DO UPDATE
+               SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum;
+           END""",
+        """CREATE TRIGGER reviews_movie_delete AFTER DELETE ON reviews BEGIN
+               UPDATE movie_stats SET count = count - 1, confidence_sum = confidence_sum - OLD.confidence
+               WHERE movie_id = OLD.movie_id AND sentiment = OLD.sentiment;
+           END""",
+        """CREATE TRIGGER reviews_movie_update AFTER UPDATE OF movie_id, sentiment, confidence ON reviews BEGIN
+               UPDATE movie_stats SET count = count - 1, confidence_sum = confidence_sum - OLD.confidence
+               WHERE movie_id = OLD.movie_id AND sentiment = OLD.sentiment;
+               INSERT INTO movie_stats (movie_id, sentiment, count, confidence_sum)
+               SELECT NEW.movie_id, NEW.sentiment, 1, NEW.confidence WHERE NEW.movie_id IS NOT NULL
+               ON CONFLICT (movie_id, sentiment) DO UPDATE
+               SET count = count + 1, confidence_sum = confidence_sum + excluded.confidence_sum;
+           END""",
+        """CREATE VIEW reviews_fts_content AS
+           SELECT id, 'u' || hex(owner) AS owner_key, movie, review FROM reviews""",
+        """CREATE VIRTUAL TABLE reviews_fts USING fts5
+           (owner_key, movie, review, content='reviews_fts_content', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2')""",
+        "INSERT INTO reviews_fts (reviews_fts) VALUES ('rebuild')",
+        """CREATE TRIGGER reviews_fts_insert AFTER INSERT ON reviews BEGIN
+               INSERT INTO reviews_fts (rowid, owner_key, movie, review)
+               VALUES (NEW.id, 'u' || hex(NEW.owner), NEW.movie, NEW.review);
+           END""",
+        """CREATE TRIGGER reviews_fts_delete AFTER DELETE ON reviews BEGIN
+               INSERT INTO reviews_fts (reviews_fts, rowid, owner_key, movie, review)
+               VALUES ('delete', OLD.id, 'u' || hex(OLD.owner), OLD.movie, OLD.review);
+           END""",
+        """CREATE TRIGGER reviews_fts_update AFTER UPDATE OF owner, movie, review ON reviews BEGIN
+               INSERT INTO reviews_fts (reviews_fts, rowid, owner_key, movie, review)
+               VALUES ('delete', OLD.id, 'u' || hex(OLD.owner), OLD.movie, OLD.review);
+               INSERT INTO reviews_fts (rowid, owner_key, movie, review)
+               VALUES (NEW.id, 'u' || hex(NEW.owner), NEW.movie, NEW.review);
+           END""",
+        "CREATE TABLE review_terms (term TEXT PRIMARY KEY) WITHOUT ROWID",
+        "CREATE VIRTUAL TABLE temp.reviews_fts_vocab USING fts5vocab(main, reviews_fts, 'col')",
+        "INSERT INTO review_terms SELECT DISTINCT term FROM temp.reviews_fts_vocab WHERE col != 'owner_key'",
+        "DROP TABLE temp.reviews_fts_vocab",
+        """CREATE VIRTUAL TABLE movies_fts USING fts5
+           (title, content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+        "INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')",
+        """CREATE TRIGGER movies_fts_insert AFTER INSERT ON movies BEGIN
+               INSERT INTO movies_fts (rowid, title) VALUES (NEW.id, NEW.title);
+           END""",
+    ],
+]
+
+def movie_key(title):
+    """Canonical title: accents and punctuation dropped, case folded, spaces collapsed.
+
+    "Amélie", "amelie" and " AMÉLIE! " all map to "amelie". None when nothing is left
+    (no title, "", "!!!"): such reviews get no movie instead of sharing one.
+    """
+    return " ".join(re.sub(r"[^\w\s]|_", " ", fold(title or "")).split()) or None
+
+def fold(text):
+    # Accents dropped and case folded, like the FTS tokenizer (unicode61 remove_diacritics 2)
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+def index_terms(*texts):
+    """The words the FTS tokenizer indexes for `texts`, for review_terms."""
+    return {term for text in texts if text for term in re.findall(r"[^\W_]+", fold(text))}
+
+def fts_query(text):
+    # Every word becomes a quoted term, so user input can't break the FTS5 syntax. Only the
+    # last one matches as a prefix (search-as-you-type); expanding common words like "the*"
+    # would merge the doclists of every token they start.
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+# A prefix expands to at most this many indexed words, in alphabetical order
+MAX_PREFIX_TERMS = 64
+
+def owner_token(username):
+    # Matches 'u' || hex(owner) in the reviews_fts triggers: one alphanumeric token per
+    # user, whatever characters the name has, so it can't collide with another user's
+    return "u" + username.encode().hex().upper()
+
+MOVIE_UPSERT = "INSERT INTO movies (key, title) VALUES (?, ?) ON CONFLICT (key) DO NOTHING"
+TERMS_INSERT = "INSERT OR IGNORE INTO review_terms (term) VALUES (?)"
+
+# Trend periods, derived from the daily counters; weeks are labelled by their Monday,
+# so a week spanning New Year stays one bucket
+PERIODS = {
+    "day": "day",
+    "week": "date(day, 'weekday 0', '-6 days')",
+    "month": "substr(day, 1, 7)",
+}
 
 class DatabaseManager:
     def __init__(self, db_path='movie_diary.db'):
         self.db_path = db_path
+        # One connection per thread, reused for the life of the thread
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
         self.init_db()
 
-    def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # sqlite3 keeps compiled statements per connection; since each SQL
+            # string below is a constant, repeated calls reuse the prepared statement
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=128)
+            self._configure(conn)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
         return conn
 
+    @staticmethod
+    def _configure(conn):
+        """What every connection needs for the schema to work, tuning pragmas aside."""
+        conn.row_factory = sqlite3.Row
+        # Used by migration 5 to backfill the movie dimension
+        conn.create_function("movie_key", 1, movie_key, deterministic=True)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
     def init_db(self):
-        with self._get_connection() as conn:
+        with self.connection() as conn:
             c = conn.cursor()
-            c.execute('''CREATE TABLE IF NOT EXISTS users 
+            c.execute('''CREATE TABLE IF NOT EXISTS users
                          (username TEXT PRIMARY KEY, hashed_password TEXT)''')
-            c.execute('''CREATE TABLE IF NOT EXISTS reviews 
-                         (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            c.execute('''CREATE TABLE IF NOT EXISTS reviews
+                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
                           owner TEXT, date TEXT, movie TEXT, sentiment TEXT, confidence TEXT)''')
-            conn.commit()
+        self._migrate()
+
+    def _migrate(self):
+        conn = self.connection()
+        while True:
+            # IMMEDIATE takes the write lock before the version is read, so when several
+            # workers start at once only one runs each step and the rest see it done
+            conn.execute("BEGIN IMMEDIATE")
+            with conn:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(MIGRATIONS):
+                    return
+                for statement in MIGRATIONS[version]:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
 
+    @DB_SECONDS.timed("create_user")
     def create_user(self, username, hashed_password):
-        with self._get_connection() as conn:
-            conn.execute("INSERT INTO users (username, hashed_password) VALUES (?, ?)", 
+        with self.connection() as conn:
+            conn.execute("INSERT INTO users (username, hashed_password) VALUES (?, ?)",
                          (username, hashed_password))
 
+    @DB_SECONDS.timed("get_user")
     def get_user(self, username):
-        with self._get_connection() as conn:
+        with self.connection() as conn:
             return conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
 
-    def save_review(self, owner, date, movie, sentiment, confidence):
-        with self._get_connection() as conn:
-            conn.execute("""INSERT INTO reviews (owner, date, movie, sentiment, confidence) 
-                            VALUES (?, ?, ?, ?, ?)""", (owner, date, movie, sentiment, confidence))
+    @DB_SECONDS.timed("save_review")
+    def save_review(self, owner, date, movie, sentiment, confidence, review=None):
+        self._insert_reviews([(owner, date, movie, sentiment, confidence, review)])
+
+    @DB_SECONDS.timed("save_reviews")
+    def save_reviews(self, rows):
+        # rows: (owner, date, movie, sentiment, confidence, review) tuples, written in a single transaction
+        self._insert_reviews(rows)
 
-    def get_history(self, username):
-        with self._get_connection() as conn:
-            rows = conn.execute("SELECT * FROM reviews WHERE owner = ? ORDER BY id DESC", (username,)).fetchall()
+    def _insert_reviews(self, rows):
+        # Movies are added in the same transaction as their reviews, and the triggers
+        # update every aggregate and FTS index in it too
+        rows = [(*row, movie_key(row[2])) for row in rows]
+        with self.connection() as conn:
+            # Distinct movies; the first spelling becomes the title. Rows without a key keep movie_id NULL
+            conn.executemany(MOVIE_UPSERT, dict.fromkeys((row[-1], row[2]) for row in rows if row[-1]))
+            conn.executemany(TERMS_INSERT, ((term,) for term in index_terms(*(t for row in rows for t in (row[2], row[5])))))
+            conn.executemany("""INSERT INTO reviews (owner, date, movie, sentiment, confidence, review, movie_id)
+                                VALUES (?, ?, ?, ?, ?, ?, (SELECT id FROM movies WHERE key = ?))""", rows)
+
+    @DB_SECONDS.timed("get_history")
+    def get_history(self, username, limit=None, before_id=None, since_id=None):
+        # Keyset pagination: newest first, `before_id` pages backwards and
+        # `since_id` returns only rows added after the newest one a client has
+        query = "SELECT id, owner, date, movie, sentiment, confidence, review FROM reviews WHERE owner = ?"
+        params = [username]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        if since_id is not None:
+            query += " AND id > ?"
+            params.append(since_id)
+        query += " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
             return [dict(row) for row in rows]
 
-    def delete_review(self, review_id):
-        with self._get_connection() as conn:
-            conn.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
+    @DB_SECONDS.timed("get_stats")
+    def get_stats(self, username, period="day"):
+        with self.connection() as conn:
+            by_sentiment = conn.execute("""SELECT sentiment, SUM(count) AS count, SUM(confidence_sum) AS total
+                                           FROM review_stats WHERE owner = ?
+                                           GROUP BY sentiment HAVING SUM(count) > 0""", (username,)).fetchall()
+            by_bucket = dict(conn.execute("""SELECT bucket, SUM(count) FROM review_stats
+                                             WHERE owner = ? GROUP BY bucket""", (username,)).fetchall())
+            trend_rows = conn.execute(f"""SELECT {PERIODS[period]} AS period, sentiment, SUM(count) AS count
+                                          FROM review_daily WHERE owner = ? AND count > 0
+                                          GROUP BY 1, 2 ORDER BY 1""", (username,)).fetchall()
+        total = sum(row['count'] for row in by_sentiment)
+        trend = {}
+        for row in trend_rows:
+            trend.setdefault(row['period'], {"period": row['period']})[row['sentiment']] = row['count']
+        return {
+            "total": total,
+            "sentiment_counts": {row['sentiment']: row['count'] for row in by_sentiment},
+            "average_confidence": sum(row['total'] for row in by_sentiment) / total if total else None,
+            "confidence_histogram": [{"start": b / 10, "end": (b + 1) / 10, "count": by_bucket.get(b, 0)}
+                                     for b in range(10)],
+            "trend": list(trend.values()),
+        }
+
+    @DB_SECONDS.timed("get_version")
+    def get_version(self, username):
+        """Bumped by every insert, update or delete of the user's reviews; 0 before the first one."""
+        with self.connection() as conn:
+            row = conn.execute("SELECT version FROM diary_versions WHERE owner = ?", (username,)).fetchone()
+            return row[0] if row else 0
+
+    @DB_SECONDS.timed("get_movie_stats")
+    def get_movie_stats(self, title):
+        """Sentiment across every diary for the movie `title` canonicalizes to; None if unknown."""
+        with self.connection() as conn:
+            movie = conn.execute("SELECT id, title FROM movies WHERE key = ?", (movie_key(title),)).fetchone()
+            if movie is None:
+                return None
+            rows = conn.execute("""SELECT sentiment, count, confidence_sum FROM movie_stats
+                                   WHERE movie_id = ? AND count > 0""", (movie['id'],)).fetchall()
+        total = sum(row['count'] for row in rows)
+        return {
+            "title": movie['title'],
+            "total": total,
+            "sentiment_counts": {row['sentiment']: row['count'] for row in rows},
+            "average_confidence": sum(row['confidence_sum'] for row in rows) / total if total else None,
+        }
+
+    @DB_SECONDS.timed("search")
+    def search(self, username, text, limit=20):
+        """Full-text search: movies by title, with their stats, and the user's own reviews
+        by title or text, newest first."""
+        query = fts_query(text)
+        if not query:
+            return {"movies": [], "reviews": []}
+        with self.connection() as conn:
+            movies = conn.execute("""SELECT m.title, SUM(s.count) AS total,
+                                            SUM(CASE WHEN s.sentiment = 'POSITIVE' THEN s.count ELSE 0 END) AS positive,
+                                            SUM(s.confidence_sum) / NULLIF(SUM(s.count), 0) AS average_confidence
+                                     FROM (SELECT rowid, rank FROM movies_fts WHERE movies_fts MATCH ?
+                                           ORDER BY rank LIMIT ?) f
+                                     JOIN movies m ON m.id = f.rowid
+                                     JOIN movie_stats s ON s.movie_id = m.id
+                                     GROUP BY m.id HAVING SUM(s.count) > 0 ORDER BY MIN(f.rank)""",
+                                  (query, limit)).fetchall()
+            reviews = self._search_reviews(conn, username, text, limit)
+        return {"movies": [dict(row) for row in movies], "reviews": [dict(row) for row in reviews]}
+
+    def _search_reviews(self, conn, username, text, limit):
+        # The owner token restricts the match to the user's own reviews inside the index, so
+        # the cost follows the size of their diary, not the table. An FTS5 prefix term
+        # ("movi"*) would still merge the doclists of every review in the table, so the last
+        # word is expanded to exact terms from review_terms instead.
+        tokens = re.findall(r"[^\W_]+", fold(text))
+        if not tokens:
+            return []
+        *words, prefix = tokens
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        terms = [row[0] for row in conn.execute("""SELECT term FROM review_terms WHERE term >= ? AND term < ?
+                                                   ORDER BY term LIMIT ?""", (prefix, upper, MAX_PREFIX_TERMS))]
+        if not terms:
+            return []
+        query = " AND ".join([f'owner_key : "{owner_token(username)}"'] + [f'"{word}"' for word in words]
+                             + ["(" + " OR ".join(f'"{term}"' for term in terms) + ")"])
+        # Newest first
+        return conn.execute("""SELECT r.id, r.date, r.movie, r.sentiment, r.confidence,
+                                      snippet(reviews_fts, 2, '[', ']', '…', 12) AS snippet
+                               FROM reviews_fts JOIN reviews r ON r.id = reviews_fts.rowid
+                               WHERE reviews_fts MATCH ?
+                               ORDER BY reviews_fts.rowid DESC LIMIT ?""", (query, limit)).fetchall()
+
+    @DB_SECONDS.timed("delete_review")
+    def delete_review(self, review_id, owner):
+        """Returns False when the review doesn't exist or belongs to someone else."""
+        with self.connection() as conn:
+            cur = conn.execute("DELETE FROM reviews WHERE id = ? AND owner = ?", (review_id, owner))
+            return cur.rowcount > 0
 
-    def update_review(self, review_id, movie, sentiment, confidence):
-        with self._get_connection() as conn:
-            conn.execute("UPDATE reviews SET movie = ?, sentiment = ?, confidence = ? WHERE id = ?", 
-                         (movie, sentiment, confidence, review_id))
\ No newline at end of file
+    @DB_SECONDS.timed("update_review")
+    def update_review(self, review_id, owner, movie, sentiment, confidence, review=None):
+        key = movie_key(movie)
+        with self.connection() as conn:
+            if key:
+                conn.execute(MOVIE_UPSERT, (key, movie))
+            conn.executemany(TERMS_INSERT, ((term,) for term in index_terms(movie, review)))
+            cur = conn.execute("""UPDATE reviews SET movie = ?, sentiment = ?, confidence = ?,
+                                  review = COALESCE(?, review), movie_id = (SELECT id FROM movies WHERE key = ?)
+                                  WHERE id = ? AND owner = ?""",
+                               (movie, sentiment, confidence, review, key, review_id, owner))
+            return cur.rowcount > 0
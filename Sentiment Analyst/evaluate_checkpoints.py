@@ -0,0 +1,173 @@
+# Sweeps the final model and every checkpoint-* in sentiment-model (optionally as quantized
+# and ONNX variants) over test_data, and writes the registry manifest main.py serves from.
+# Usage: python evaluate_checkpoints.py [--model-dir ./sentiment-model] [--backends torch quantized]
+#                                       [--export] [--max-accuracy-drop 0.01]
+#
+# Each variant is measured in its own fresh process, so its memory figures are its own.
+# The selected variant is the fastest (p50 at batch size 1) among those whose accuracy is
+# within --max-accuracy-drop of the best one. Serve another entry with
+# POST /admin/model {"id": "..."} or pin one with --select.
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backends import BACKENDS, ONNX_FILES
+from model_loader import LOCAL_DIR, has_weights
+
+
+def _rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _dir_mb(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+               if os.path.isfile(os.path.join(path, name))) / (1024 * 1024)
+
+
+def evaluate(path, backend, data, limit, batch_size, latency_samples, threads):
+    # Runs in a spawned child; imports happen here so the baseline excludes the model only
+    import numpy as np
+    import torch
+    from datasets import load_from_disk
+    from sklearn.metrics import f1_score
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    from backends import load_backend
+    from inference import SequenceClassifier
+
+    if threads:
+        torch.set_num_threads(threads)
+    ds = load_from_disk(data)
+    if limit:
+        ds = ds.select(range(min(limit, len(ds))))
+    input_ids, labels = ds["input_ids"], np.array(ds["label"])
+    baseline = _rss_mb()
+
+    start = time.perf_counter()
+    model = AutoModelForSequenceClassification.from_pretrained(path)
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    classifier = SequenceClassifier(model, tokenizer, batch_size=batch_size,
+                                    backend=load_backend(backend, model, os.path.join(path, "onnx")))
+    load_s = time.perf_counter() - start
+
+    classifier.predict_ids(input_ids[:batch_size])
+    start = time.perf_counter()
+    preds = classifier.predict_ids(input_ids).argmax(axis=1)
+    throughput = len(input_ids) / (time.perf_counter() - start)
+    timings = []
+    for ids in input_ids[:latency_samples]:
+        start = time.perf_counter()
+        classifier.predict_ids([ids])
+        timings.append(time.perf_counter() - start)
+    ms = np.asarray(timings) * 1000
+    result = {
+        "accuracy": (preds == labels).mean(),
+        "f1": f1_score(labels, preds, average="macro"),
+        "p50_ms": np.percentile(ms, 50),
+        "p95_ms": np.percentile(ms, 95),
+        "throughput": throughput,
+        "load_s": load_s,
+        "peak_rss_mb": _rss_mb(),
+        "model_rss_mb": _rss_mb() - baseline,
+    }
+    return {k: round(float(v), 4) for k, v in result.items()}
+
+
+def candidates(model_dir):
+    """(name, path, step) for the final model and each checkpoint-N, oldest first."""
+    found = []
+    for name in os.listdir(model_dir):
+        match = re.fullmatch(r"checkpoint-(\d+)", name)
+        if match:
+            found.append((name, os.path.join(model_dir, name), int(match.group(1))))
+    found.sort(key=lambda c: c[2])
+    found.append(("final", model_dir, None))
+    return found
+
+
+def select(entries, max_accuracy_drop):
+    best = max(e["accuracy"] for e in entries)
+    eligible = [e for e in entries if e["accuracy"] >= best - max_accuracy_drop]
+    return min(eligible, key=lambda e: e["p50_ms"])["id"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=LOCAL_DIR)
+    parser.add_argument("--data", default="test_data")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["torch", "quantized"])
+    parser.add_argument("--export", action="store_true",
+                        help="export checkpoints without <checkpoint>/onnx first (needed for the onnx backends)")
+    parser.add_argument("--manifest", help="defaults to <model-dir>/registry.json")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    parser.add_argument("--select", help="pin this entry id instead of the automatic choice")
+    parser.add_argument("--limit", type=int, default=0, help="test rows to score (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-samples", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per run (0 = torch default)")
+    args = parser.parse_args()
+    manifest_path = args.manifest or os.path.join(args.model_dir, "registry.json")
+
+    entries = []
+    for name, path, step in candidates(args.model_dir):
+        if not has_weights(path):
+            print(f"⚠️  {path} has no weights, skipping")
+            continue
+        for backend in args.backends:
+            if backend in ONNX_FILES and not os.path.exists(os.path.join(path, "onnx", ONNX_FILES[backend])):
+                if not args.export:
+                    print(f"⚠️  {path} has no {ONNX_FILES[backend]} (pass --export), skipping {backend}")
+                    continue
+                from export_model import export
+                export(path)
+            print(f"⏱️  {name} / {backend}")
+            # A fresh process per variant keeps peak RSS and allocator state independent
+            with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+                result = pool.submit(evaluate, path, backend, args.data, args.limit, args.batch_size,
+                                     args.latency_samples, args.threads).result()
+            entries.append({
+                "id": f"{name}:{backend}",
+                "path": os.path.relpath(path, os.path.dirname(os.path.abspath(manifest_path))),
+                "backend": backend,
+                "step": step,
+                "disk_mb": round(_dir_mb(os.path.join(path, "onnx") if backend in ONNX_FILES else path), 1),
+                **result,
+            })
+    if not entries:
+        sys.exit(f"No model weights found under {args.model_dir}")
+
+    selected = args.select or select(entries, args.max_accuracy_drop)
+    if selected not in {e["id"] for e in entries}:
+        sys.exit(f"--select {selected!r} is not one of the evaluated entries")
+    manifest = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data": args.data,
+        "rows": args.limit or None,
+        "machine": {"python": platform.python_version(), "cpus": os.cpu_count(), "threads": args.threads or None},
+        "rule": f"fastest p50 within {args.max_accuracy_drop:.2%} of the best accuracy"
+                if not args.select else "pinned with --select",
+        "selected": selected,
+        "models": entries,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"\n{'id':<28} {'accuracy':>9} {'F1':>7} {'p50 ms':>7} {'p95 ms':>7} {'rows/s':>8} {'RSS MB':>7} {'disk MB':>8}")
+    for e in sorted(entries, key=lambda e: e["p50_ms"]):
+        mark = "  ⭐" if e["id"] == selected else ""
+        print(f"{e['id']:<28} {e['accuracy']:>9.4f} {e['f1']:>7.4f} {e['p50_ms']:>7.2f} {e['p95_ms']:>7.2f} "
+              f"{e['throughput']:>8.0f} {e['model_rss_mb']:>7.0f} {e['disk_mb']:>8.1f}{mark}")
+    print(f"\n💾 {manifest_path} (selected: {selected})")
+
+
+if __name__ == "__main__":
+    main()
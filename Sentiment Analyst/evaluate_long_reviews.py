@@ -0,0 +1,96 @@
+# Compares truncation with chunked (sliding-window) scoring on the IMDb reviews that
+# are longer than the training length, i.e. the ones truncation cuts short.
+# Usage: python evaluate_long_reviews.py ["IMDB Dataset.csv"] [--model ./sentiment-model]
+#                                        [--chunk-tokens 128] [--overlap 32] [--limit 2000]
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from data_utils import normalize_columns
+from inference import SequenceClassifier
+from model_loader import resolve_model_path
+
+CANDIDATES = ["IMDB Dataset.csv", "IMDB_Dataset.csv", "IMDB Dateset.csv", "imdb_dataset.csv", "imdb.csv"]
+# Upper bounds (tokens) of the latency buckets
+LENGTH_BUCKETS = (256, 512, 1024, 2048, float("inf"))
+
+
+def load_reviews(path):
+    df = normalize_columns(pd.read_csv(path), required=("text", "label"))
+    if not pd.api.types.is_numeric_dtype(df["label"]):
+        df["label"] = df["label"].str.lower().map({"positive": 1, "negative": 0})
+    return df.dropna(subset=["label"])
+
+
+def bucket_name(i):
+    low = 0 if i == 0 else LENGTH_BUCKETS[i - 1]
+    high = LENGTH_BUCKETS[i]
+    return f"{low}+" if high == float("inf") else f"{low}-{high}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv", nargs="?", default=next((p for p in CANDIDATES if os.path.exists(p)), None))
+    parser.add_argument("--model", default=resolve_model_path(None))
+    parser.add_argument("--chunk-tokens", type=int, default=128, help="training length in prepare_data.py")
+    parser.add_argument("--overlap", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=2000, help="long reviews to score (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-samples", type=int, default=20, help="single-review timings per length bucket")
+    args = parser.parse_args()
+    if args.csv is None:
+        parser.error("no IMDb CSV found; pass its path")
+
+    df = load_reviews(args.csv)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    # Tokenized once, untruncated; every mode below scores the same ids
+    input_ids = tokenizer(df["text"].tolist(), truncation=False, verbose=False)["input_ids"]
+    lengths = np.array([len(ids) for ids in input_ids])
+    long_rows = np.flatnonzero(lengths > args.chunk_tokens)
+    if args.limit and len(long_rows) > args.limit:
+        long_rows = np.sort(np.random.default_rng(42).choice(long_rows, args.limit, replace=False))
+    ids = [input_ids[i] for i in long_rows]
+    labels = df["label"].to_numpy(dtype=int)[long_rows]
+    buckets = np.searchsorted(LENGTH_BUCKETS, lengths[long_rows])
+    print(f"📊 {len(ids)} of {len(df)} reviews are longer than {args.chunk_tokens} tokens "
+          f"(median {int(np.median(lengths[long_rows]))}, max {lengths[long_rows].max()})")
+
+    modes = {
+        f"truncate {args.chunk_tokens}": dict(max_length=args.chunk_tokens),
+        "truncate 512": dict(max_length=512),
+        f"chunk {args.chunk_tokens}/{args.overlap} mean": dict(max_length=args.chunk_tokens,
+                                                              chunk_overlap=args.overlap),
+        f"chunk {args.chunk_tokens}/{args.overlap} max": dict(max_length=args.chunk_tokens,
+                                                             chunk_overlap=args.overlap, aggregate="max"),
+    }
+    print(f"\n{'mode':<22} {'accuracy':>9} {'reviews/s':>10} " + " ".join(f"{bucket_name(b):>10}"
+                                                                          for b in range(len(LENGTH_BUCKETS))))
+    for name, options in modes.items():
+        classifier = SequenceClassifier(model, tokenizer, batch_size=args.batch_size, **options)
+        classifier.predict_ids(ids[:8])
+        start = time.perf_counter()
+        probs = classifier.predict_ids(ids)
+        throughput = len(ids) / (time.perf_counter() - start)
+        # Class ids match the 0/1 labels used in training (see parity_check.py)
+        accuracy = float(np.mean(probs.argmax(axis=1) == labels))
+        # p50 milliseconds for one review on its own, per length bucket
+        cells = []
+        for b in range(len(LENGTH_BUCKETS)):
+            sample = np.flatnonzero(buckets == b)[:args.latency_samples]
+            timings = []
+            for i in sample:
+                start = time.perf_counter()
+                classifier.predict_ids([ids[i]])
+                timings.append(time.perf_counter() - start)
+            cells.append(f"{np.median(timings) * 1000:>8.1f}ms" if timings else f"{'-':>10}")
+        print(f"{name:<22} {accuracy:>9.2%} {throughput:>10.1f} " + " ".join(cells))
+    print("\nLatency columns: p50 per single review, bucketed by token length.")
+
+
+if __name__ == "__main__":
+    main()
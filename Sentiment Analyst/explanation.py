@@ -0,0 +1,53 @@
+import numpy as np
+from lime.explanation import Explanation
+from lime.lime_text import IndexedString, LimeTextExplainer, TextDomainMapper
+
+
+def explanation_data(exp):
+    """The parts of a LIME text explanation `render_html` needs, as JSON-serializable values.
+
+    A few hundred bytes, where `exp.as_html()` is ~1.2 MB (LIME inlines its JS
+    bundle), so this is what gets cached and sent between processes.
+    """
+    labels = list(exp.local_exp.keys())
+    label = labels[0] if labels else 0
+    return {
+        "label": int(label),
+        "features": [[int(i), float(w)] for i, w in exp.local_exp.get(label, [])],
+        "probs": [float(p) for p in exp.predict_proba],
+        "class_names": [str(c) for c in exp.class_names],
+    }
+
+
+def render_html(text, data):
+    """Rebuilds the LIME explanation of `text` from `explanation_data` and renders it."""
+    # Feature ids index the words of `text`, split the same way LimeTextExplainer does by default
+    exp = Explanation(TextDomainMapper(IndexedString(text)), class_names=data["class_names"])
+    exp.predict_proba = np.asarray(data["probs"])
+    exp.local_exp = {data["label"]: [tuple(f) for f in data["features"]]}
+    return exp.as_html(labels=[data["label"]])
+
+
+class FastExplainer:
+    """LIME explanations scored through a `SequenceClassifier`.
+
+    LIME always passes the unperturbed text as the first sample, so when the
+    caller already has its probabilities they are reused instead of being
+    recomputed.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.explainer = LimeTextExplainer(class_names=classifier.labels)
+
+    def explain(self, text, probs=None, num_features=10, num_samples=100):
+        def classifier_fn(texts):
+            if probs is None:
+                return self.classifier.predict_proba(texts)
+            out = np.empty((len(texts), len(self.classifier.labels)), dtype=np.float32)
+            out[0] = probs
+            out[1:] = self.classifier.predict_proba(texts[1:])
+            return out
+
+        return self.explainer.explain_instance(text, classifier_fn,
+                                               num_features=num_features, num_samples=num_samples)
@@ -0,0 +1,66 @@
+# Exports sentiment-model to ONNX plus a dynamically int8-quantized copy for ONNX Runtime.
+# Usage: python export_model.py [--model ./sentiment-model] [--output ./sentiment-model/onnx]
+import argparse
+import os
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from backends import ONNX_FILES
+
+LOCAL_DIR = "./sentiment-model"
+
+
+class LogitsOnly(torch.nn.Module):
+    # ONNX graphs want plain tensors out, not a ModelOutput
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export(model_dir, output=None, opset=17):
+    """Writes model.onnx and model.int8.onnx for `model_dir` (default: <model_dir>/onnx)."""
+    output = output or os.path.join(model_dir, "onnx")
+    os.makedirs(output, exist_ok=True)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    sample = tokenizer(["an example review", "another one"], padding=True, return_tensors="pt")
+
+    fp32_path = os.path.join(output, ONNX_FILES["onnx"])
+    torch.onnx.export(
+        LogitsOnly(model),
+        (sample["input_ids"], sample["attention_mask"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                      "attention_mask": {0: "batch", 1: "sequence"},
+                      "logits": {0: "batch"}},
+        opset_version=opset,
+        dynamo=False,
+    )
+    print(f"✅ Exported {fp32_path}")
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8_path = os.path.join(output, ONNX_FILES["onnx-int8"])
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"✅ Quantized {int8_path}")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=LOCAL_DIR)
+    parser.add_argument("--output", help="defaults to <model>/onnx")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.model, args.output, args.opset)
+    print("Check accuracy before serving it: python parity_check.py")
+
+
+if __name__ == "__main__":
+    main()
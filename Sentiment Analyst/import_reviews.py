@@ -0,0 +1,53 @@
+# Bulk-imports a Letterboxd / IMDb / Kaggle CSV into a user's diary without going through the API.
+# Usage: python import_reviews.py reviews.csv --username vlere [--batch-size 256]
+#                                 [--chunk-tokens 128] [--chunk-overlap 32]
+# Long reviews are scored like the API does (CHUNK_TOKENS / CHUNK_OVERLAP, same defaults),
+# so a review gets the same label whichever way it was imported.
+import argparse
+import os
+import time
+
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from bulk import read_reviews_csv, score_and_save
+from database import DatabaseManager
+from inference import SequenceClassifier
+from model_loader import resolve_model_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("csv")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--db", default="movie_diary.db")
+    parser.add_argument("--model", default=resolve_model_path(None))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--chunk-tokens", type=int, default=int(os.getenv("CHUNK_TOKENS", "128")),
+                        help="window length for long reviews (0 = truncate at --max-length)")
+    parser.add_argument("--chunk-overlap", type=int, default=int(os.getenv("CHUNK_OVERLAP", "32")))
+    parser.add_argument("--max-length", type=int, default=512)
+    args = parser.parse_args()
+
+    df = read_reviews_csv(args.csv)
+    print(f"✔ Loaded {len(df)} reviews from {args.csv}")
+
+    model = AutoModelForSequenceClassification.from_pretrained(args.model)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    if args.chunk_tokens:
+        classifier = SequenceClassifier(model, tokenizer, batch_size=args.batch_size, max_length=args.chunk_tokens,
+                                        chunk_overlap=args.chunk_overlap)
+    else:
+        classifier = SequenceClassifier(model, tokenizer, batch_size=args.batch_size, max_length=args.max_length)
+    db = DatabaseManager(args.db)
+
+    start = time.perf_counter()
+    results = score_and_save(db, classifier, args.username, df["movie"].tolist(),
+                             df["text"].tolist(), df["date"].tolist())
+    elapsed = time.perf_counter() - start
+    positive = sum(r["sentiment"] == "POSITIVE" for r in results)
+    print(f"✅ Imported {len(results)} reviews for {args.username} in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.0f} reviews/s) — {positive} positive, {len(results) - positive} negative")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ from transformers import pipeline, AutoModelForSequenceClassification, AutoToken
 import torch
 import os
 
+from cache import PredictionCache
+from database import DatabaseManager
+
 # 1. SETUP PATHS
 # Replace 'vleramm/sentiment-model' with your actual Hugging Face username and repo name
 REPO_ID = "vleramm/sentiment-model" 
@@ -32,9 +35,20 @@ try:
         device=device
     )
 
+    # 5. CACHE RESULTS (shared with the API's diary database)
+    cache = PredictionCache(LOCAL_DIR if os.path.exists(LOCAL_DIR) else REPO_ID, db=DatabaseManager())
+
+    def classify(text):
+        result = cache.get("pipeline", text)
+        if result is None:
+            result = clf(text)
+            cache.set("pipeline", text, result)
+        return result
+
     print("\n🚀 Testing Model:")
-    print(f"Review 1: 'I absolutely loved this movie!' -> {clf('I absolutely loved this movie!')}")
-    print(f"Review 2: 'The plot was terrible and boring.' -> {clf('The plot was terrible and boring.')}")
+    print(f"Review 1: 'I absolutely loved this movie!' -> {classify('I absolutely loved this movie!')}")
+    print(f"Review 2: 'The plot was terrible and boring.' -> {classify('The plot was terrible and boring.')}")
+    print(f"Cache: {cache.stats()}")
 
 except Exception as e:
     print(f"❌ ERROR: Could not load the model. Make sure REPO_ID '{REPO_ID}' is correct.")
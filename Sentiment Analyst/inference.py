@@ -0,0 +1,257 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bucketing import length_batches
+from metrics import BATCH_SIZE, STAGE_SECONDS
+
+
+class SequenceClassifier:
+    """Scores texts straight through the model, without `pipeline` post-processing.
+
+    All texts are tokenized in one call and run in fixed-size tensor batches;
+    `predict_proba` returns an (n_texts, n_labels) softmax matrix whose columns
+    follow `model.config.id2label`. With `sort_by_length` the batches are formed
+    from sequences of similar length (rows still come back in input order), and
+    `padding_ratio` reports how much of the scored tensors was padding. The
+    forward pass itself is delegated to `backend` (see backends.py), plain
+    PyTorch by default.
+
+    Sequences longer than `max_length` are truncated, unless `chunk_overlap` is
+    set: then they are cut into windows of `max_length` tokens that overlap by
+    `chunk_overlap`, the windows of every text are scored together in the same
+    batches, and their logits are combined per text (`aggregate="mean"` weights
+    each window by its token count, `"max"` keeps the most confident window).
+    Cost then grows linearly with length instead of quadratically.
+    """
+
+    def __init__(self, model, tokenizer, batch_size=128, max_length=512, sort_by_length=True, backend=None,
+                 chunk_overlap=None, aggregate="mean"):
+        self.model = model.eval()
+        if backend is None:
+            from backends import TorchBackend
+            backend = TorchBackend(self.model)
+        if chunk_overlap is not None and not 0 <= chunk_overlap < max_length - 2:
+            raise ValueError(f"chunk_overlap must be between 0 and max_length - 3, got {chunk_overlap}")
+        if aggregate not in ("mean", "max"):
+            raise ValueError(f"Unknown aggregate {aggregate!r}; expected 'mean' or 'max'.")
+        self.backend = backend
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.sort_by_length = sort_by_length
+        self.chunk_overlap = chunk_overlap
+        self.aggregate = aggregate
+        self.labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+        # Fast tokenizers fail with "Already borrowed" when encoding from several threads at once
+        self.tokenizer_lock = threading.Lock()
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.windows = 0
+
+    @property
+    def padding_ratio(self):
+        return 1 - self.real_tokens / self.padded_tokens if self.padded_tokens else 0.0
+
+    def top_label(self, probs):
+        idx = int(np.argmax(probs))
+        return self.labels[idx], float(probs[idx])
+
+    def predict_proba(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, len(self.labels)), dtype=np.float32)
+        # No padding here: each batch is padded to its own longest member in predict_ids.
+        # When chunking, the full text is kept and split into windows from the ids.
+        truncate = self.chunk_overlap is None
+        with self.tokenizer_lock, STAGE_SECONDS.time("tokenize"):
+            enc = self.tokenizer(texts, truncation=truncate, max_length=self.max_length if truncate else None,
+                                 verbose=False)
+        return self.predict_ids(enc["input_ids"])
+
+    def predict_ids(self, input_ids):
+        """Scores pre-tokenized sequences (e.g. the `input_ids` column of the saved datasets)."""
+        if self.chunk_overlap is None:
+            return _softmax(self._logits([self._truncate(ids) for ids in input_ids]))
+        seqs, owners = [], []
+        for i, ids in enumerate(input_ids):
+            windows = self._windows(ids)
+            seqs.extend(windows)
+            owners.extend([i] * len(windows))
+        self.windows += len(seqs)
+        logits = self._logits(seqs)
+        owners = np.asarray(owners, dtype=np.int64)
+        combined = np.zeros((len(input_ids), len(self.labels)), dtype=np.float32)
+        if self.aggregate == "mean":
+            weights = np.array([len(seq) for seq in seqs], dtype=np.float32)
+            np.add.at(combined, owners, logits * weights[:, None])
+            combined /= np.bincount(owners, weights, minlength=len(input_ids))[:, None]
+        else:
+            # Windows come grouped by text; keep each text's most confident one
+            confidence = _softmax(logits).max(axis=1)
+            starts = np.searchsorted(owners, np.arange(len(input_ids)))
+            for i, (start, end) in enumerate(zip(starts, list(starts[1:]) + [len(seqs)])):
+                combined[i] = logits[start + int(np.argmax(confidence[start:end]))]
+        return _softmax(combined)
+
+    def _logits(self, seqs):
+        logits = np.empty((len(seqs), len(self.labels)), dtype=np.float32)
+        lengths = [len(seq) for seq in seqs]
+        if self.sort_by_length:
+            batches = length_batches(lengths, self.batch_size)
+        else:
+            batches = [np.arange(i, min(i + self.batch_size, len(seqs))) for i in range(0, len(seqs), self.batch_size)]
+        pad_id = self.tokenizer.pad_token_id or 0
+        for rows in batches:
+            width = max(lengths[i] for i in rows)
+            ids = np.full((len(rows), width), pad_id, dtype=np.int64)
+            mask = np.zeros_like(ids)
+            for row, i in enumerate(rows):
+                ids[row, :lengths[i]] = seqs[i]
+                mask[row, :lengths[i]] = 1
+            with STAGE_SECONDS.time("forward"):
+                logits[rows] = self.backend.logits(ids, mask)
+            self.real_tokens += sum(lengths[i] for i in rows)
+            self.padded_tokens += width * len(rows)
+        return logits
+
+    def _truncate(self, ids):
+        # Keep the trailing [SEP] when cutting a sequence down to max_length
+        ids = list(ids)
+        return ids if len(ids) <= self.max_length else ids[:self.max_length - 1] + ids[-1:]
+
+    def _windows(self, ids):
+        # Every window gets the sequence's own [CLS] ... [SEP] around its slice of the body
+        ids = list(ids)
+        if len(ids) <= self.max_length:
+            return [ids]
+        head, body, tail = ids[:1], ids[1:-1], ids[-1:]
+        size = self.max_length - 2
+        step = size - self.chunk_overlap
+        return [head + body[start:start + size] + tail
+                for start in range(0, max(1, len(body) - self.chunk_overlap), step)]
+
+
+def _softmax(logits):
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class BatchingInferenceEngine:
+    """Groups texts from concurrent requests into a single forward pass.
+
+    Callers await `predict(text)`; a background task waits up to `max_wait_ms`
+    (or until `max_batch_size` texts are queued) and hands the whole batch to
+    `predict_fn` on a dedicated inference thread, so the event loop never runs
+    the model itself. With `concurrency` > 1 that many batches are in flight at
+    once, which only makes sense when `predict_fn` is thread-safe (e.g. it hands
+    the batch to a worker process pool).
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, concurrency=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.concurrency = concurrency
+        # `concurrency` batches run at once (one per worker with INFERENCE_WORKERS). This does
+        # not serialize the model: explanation jobs call the classifier from their own threads,
+        # and only SequenceClassifier.tokenizer_lock guards the (not thread-safe) tokenizer
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="inference")
+        self._loop = None
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._inflight = set()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The queue and worker task belong to one event loop (test clients may use several)
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def predict(self, text):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def predict_many(self, texts):
+        """Scores a bulk request in `max_batch_size` slices, one inference-thread turn each.
+
+        Micro-batches queued meanwhile run between the slices, so an import of
+        thousands of texts delays interactive calls by one slice, not by all of it.
+        Texts are sliced in length order to keep the padding per slice low.
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), self.max_batch_size):
+            chunk = order[start:start + self.max_batch_size]
+            for i, result in zip(chunk, await self.run(self.predict_fn, [texts[i] for i in chunk])):
+                results[i] = result
+        return results
+
+    async def run(self, fn, *args):
+        # Runs any other model-bound work (e.g. LIME) on the same inference thread
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (client disconnect) don't need a slot in the batch
+        return [(text, fut) for text, fut in batch if not fut.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+            if not batch:
+                self._slots.release()
+                continue
+            # The loop only keeps weak references to tasks
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        texts = [text for text, _ in batch]
+        BATCH_SIZE.observe(len(texts))
+        try:
+            with STAGE_SECONDS.time("inference_batch"):
+                results = await self.run(self.predict_fn, texts)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._executor.shutdown(wait=False)
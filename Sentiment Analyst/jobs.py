@@ -0,0 +1,67 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExplanationJobs:
+    """Runs explanations on a bounded worker pool and keeps their results for polling.
+
+    `submit` returns None instead of queueing when `max_pending` jobs are already
+    waiting or running. Finished jobs are dropped `ttl` seconds after completion,
+    or earlier, oldest first, once more than `max_results` are kept (an HTML
+    explanation is ~1.2 MB).
+    """
+
+    def __init__(self, max_workers=2, max_pending=64, ttl=600, max_results=64):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="explain")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            return None
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            self._jobs[job_id] = {"status": "pending"}
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    @property
+    def pending(self):
+        with self._lock:
+            return sum(job["status"] == "pending" for job in self._jobs.values())
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return {k: v for k, v in job.items() if k != "finished"} if job else None
+
+    def _run(self, job_id, fn, args, kwargs):
+        try:
+            result = {"status": "done", "explanation_html": fn(*args, **kwargs)}
+        except Exception as e:
+            result = {"status": "error", "detail": str(e)}
+        finally:
+            self._slots.release()
+        with self._lock:
+            # Re-inserted so finished jobs stay ordered by completion time
+            self._jobs.pop(job_id, None)
+            self._jobs[job_id] = {**result, "finished": time.monotonic()}
+            self._expire()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        finished = [j for j, job in self._jobs.items() if "finished" in job]
+        overflow = max(0, len(finished) - self.max_results)
+        for i, job_id in enumerate(finished):
+            if i < overflow or self._jobs[job_id]["finished"] < cutoff:
+                del self._jobs[job_id]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,39 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Depends, Header, Request, Response
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from transformers import pipeline
 import numpy as np
-from lime.lime_text import LimeTextExplainer
 from datetime import datetime
-from passlib.context import CryptContext
 from fastapi.middleware.cors import CORSMiddleware
 
 
 # Importojmë menaxherin e databazës (OOP)
 from database import DatabaseManager 
+from auth import PasswordHasher, SessionTokens
+from inference import BatchingInferenceEngine
+from model_loader import MANIFEST_PATH, ModelService, manifest_entry, resolve_model_path
+from worker_pool import InferencePool
+from jobs import ExplanationJobs
+from cache import PredictionCache
+from metrics import REGISTRY, REQUEST_SECONDS, STAGE_SECONDS, Callback
+from profiler import SlowRequestProfiler
+@asynccontextmanager
+async def lifespan(app):
+    # Load + warm up on the inference thread without blocking startup; /ready flips when done
+    warmup = asyncio.create_task(engine.run(models.warmup))
+    yield
+    if not warmup.done():
+        warmup.cancel()
 
-app = FastAPI()
-db = DatabaseManager()
+app = FastAPI(lifespan=lifespan)
+db = DatabaseManager(os.getenv("DB_PATH", "movie_diary.db"))
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,39 +41,258 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # --- 1. AI SETUP ---
-clf = pipeline("sentiment-analysis", model="vleramm/sentiment-model", top_k=None)
-explainer = LimeTextExplainer(class_names=["NEGATIVE", "POSITIVE"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b")
+# MODEL_PATH, else the entry selected in MODEL_MANIFEST (written by evaluate_checkpoints.py),
+# else ./sentiment-model when it holds weights, else the hub id (HF cache first)
+MODEL_MANIFEST = os.getenv("MODEL_MANIFEST", MANIFEST_PATH)
+selected_model = None if os.getenv("MODEL_PATH") else manifest_entry(MODEL_MANIFEST)
+MODEL_PATH = selected_model["path"] if selected_model else resolve_model_path(os.getenv("MODEL_PATH"))
+MODEL_ID = selected_model["id"] if selected_model else None
+# torch | quantized | onnx | onnx-int8 (ONNX files come from export_model.py; check them with parity_check.py)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND") or (selected_model["backend"] if selected_model else "torch")
+MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "0") == "1"
+# 0 runs the model in this process; N > 0 starts N worker processes sharing mmap'ed weights
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# Long reviews are scored in overlapping windows of the training length (prepare_data.py: 128 tokens);
+# CHUNK_TOKENS=0 truncates them at 512 tokens instead
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "128"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "32"))
+
+def build_models(path, backend, onnx_dir=None):
+    if INFERENCE_WORKERS > 0:
+        return InferencePool(path, INFERENCE_WORKERS, threads=int(os.getenv("INFERENCE_THREADS", "0")) or None,
+                             backend=backend, onnx_dir=onnx_dir, offline=MODEL_OFFLINE,
+                             chunk_tokens=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP)
+    return ModelService(path, backend=backend, onnx_dir=onnx_dir, offline=MODEL_OFFLINE,
+                        chunk_tokens=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP)
+
+def cache_variant(backend):
+    return f"{backend}:chunk{CHUNK_TOKENS}-{CHUNK_OVERLAP}" if CHUNK_TOKENS else backend
+
+# The model, LIME and the pipeline are loaded lazily; see lifespan() for the warm-up.
+# POST /admin/model replaces `models` with another registry entry without a restart.
+models = build_models(MODEL_PATH, INFERENCE_BACKEND, os.getenv("ONNX_DIR"))
+# Set ADMIN_TOKEN to enable /admin/model
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+swap_lock = asyncio.Lock()
+
+# bcrypt runs on its own small thread pool; 12 rounds is passlib's default cost
+hasher = PasswordHasher(rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+                        max_workers=int(os.getenv("HASH_WORKERS", "2")))
+# Set the same SESSION_SECRET on every server process so tokens stay valid across them
+sessions = SessionTokens(os.getenv("SESSION_SECRET"), ttl=float(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600))))
+bearer = HTTPBearer(auto_error=False)
+
+# Concurrent /analyze and /update calls share one padded forward pass
+engine = BatchingInferenceEngine(
+    lambda texts: models.classifier.predict_proba(texts),
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("BATCH_WAIT_MS", "5")),
+    # One batch in flight per worker process
+    concurrency=max(1, INFERENCE_WORKERS),
+)
+
+# LIME runs in the background; /analyze only waits for the forward pass
+explanation_jobs = ExplanationJobs(
+    max_workers=int(os.getenv("EXPLAIN_WORKERS", "2")),
+    max_pending=int(os.getenv("EXPLAIN_QUEUE_SIZE", "64")),
+    max_results=int(os.getenv("EXPLAIN_MAX_RESULTS", "64")),
+)
+
+# Repeated texts skip the model; the disk tier lives in the diary database
+cache = PredictionCache(
+    MODEL_PATH,
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(float(os.getenv("CACHE_MAX_MB", "64")) * 1024 * 1024),
+    max_disk_bytes=int(float(os.getenv("CACHE_DISK_MAX_MB", "512")) * 1024 * 1024),
+    ttl=float(os.getenv("CACHE_TTL_SECONDS", str(24 * 3600))),
+    db=db if os.getenv("CACHE_DISK", "1") == "1" else None,
+    variant=cache_variant(INFERENCE_BACKEND),
+)
+
+# --- 1b. OBSERVABILITY ---
+# Opt-in: PROFILE_SLOW_MS=500 writes folded stacks of requests slower than that to PROFILE_DIR,
+# at most PROFILE_MAX_PER_MINUTE of them
+profiler = SlowRequestProfiler(
+    slow_ms=float(os.environ["PROFILE_SLOW_MS"]),
+    interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "10")),
+    output_dir=os.getenv("PROFILE_DIR", "profiles"),
+    max_dumps_per_minute=int(os.getenv("PROFILE_MAX_PER_MINUTE", "10")),
+) if os.getenv("PROFILE_SLOW_MS") else None
+
+def cache_counts(kind):
+    counts = cache.hits if kind == "hits" else cache.misses
+    return {(ns,): n for ns, n in list(counts.items())}
+
+def cache_hit_ratio():
+    namespaces = set(cache.hits) | set(cache.misses)
+    return {(ns,): cache.hits.get(ns, 0) / max(1, cache.hits.get(ns, 0) + cache.misses.get(ns, 0))
+            for ns in namespaces}
+
+for metric in (
+    Callback("sentiment_inference_queue_depth", "Texts waiting for the next micro-batch.", lambda: engine.queue_depth),
+    Callback("sentiment_explanation_jobs_pending", "Explanation jobs queued or running.",
+             lambda: explanation_jobs.pending),
+    Callback("sentiment_model_ready", "1 once the model is loaded and warmed up.", lambda: int(models.ready)),
+    Callback("sentiment_cache_hits_total", "Prediction cache hits.", lambda: cache_counts("hits"),
+             ("namespace",), type="counter"),
+    Callback("sentiment_cache_misses_total", "Prediction cache misses.", lambda: cache_counts("misses"),
+             ("namespace",), type="counter"),
+    Callback("sentiment_cache_hit_ratio", "Hits / lookups since start.", cache_hit_ratio, ("namespace",)),
+    Callback("sentiment_padding_ratio", "Share of scored tensor area that was padding (in-process model only).",
+             lambda: models.classifier.padding_ratio if isinstance(models, ModelService) and models.ready else 0),
+):
+    REGISTRY.register(metric)
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        end = time.perf_counter()
+        # Route templates ("/history/{username}") keep the label set small
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.observe(end - start, request.method, route, str(status))
+        if profiler is not None:
+            profiler.record(f"{request.method} {route}", start, end)
 
 # --- 2. DATA MODELS ---
 class ReviewRequest(BaseModel):
     movie: str
     review: str
-    username: str
+    # The owner comes from the session token; if sent, it must match it
+    username: Optional[str] = None
+    # Set to False to skip the explanation entirely (Fast Mode in the frontend)
+    explain: bool = True
+    # "fast" scores LIME perturbations as tensor batches; "lime" keeps the original pipeline path
+    explainer: Literal["fast", "lime"] = "fast"
+
+class BatchItem(BaseModel):
+    movie: str
+    review: str
+
+class BatchReviewRequest(BaseModel):
+    username: Optional[str] = None
+    reviews: List[BatchItem]
+    # Explanations are expensive; bulk imports skip them unless asked
+    explain: bool = False
 
 class UserAuth(BaseModel):
     username: str
     password: str
 
+class ModelSwap(BaseModel):
+    # Registry entry id (e.g. "checkpoint-2500:quantized"); defaults to the manifest's selection
+    id: Optional[str] = None
+
 # --- 3. HELPER FUNCTIONS ---
-def predict_probs(texts):
-    outputs = clf(texts)
-    probs = []
-    for out in outputs:
-        sorted_out = sorted(out, key=lambda x: x['label'])
-        probs.append([sorted_out[0]['score'], sorted_out[1]['score']])
-    return np.array(probs)
+def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)):
+    username = sessions.verify(credentials.credentials) if credentials else None
+    if username is None:
+        raise HTTPException(status_code=401, detail="Missing or expired session token. Please log in.",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+def check_owner(username, user):
+    if username is not None and username != user:
+        raise HTTPException(status_code=403, detail="You can only access your own diary.")
+
+# Mixed into every ETag so a restarted server never answers 304 for a cache built before it
+ETAG_SALT = secrets.token_hex(8)
+
+def diary_etag(username, *params):
+    # Changes whenever the user's reviews do (diary_versions) or the query does
+    raw = ":".join(map(str, (ETAG_SALT, db.get_version(username)) + params))
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:24] + '"'
+
+def not_modified(request, response, etag):
+    """Sets the ETag; returns a 304 response when the client already holds this version."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    sent = request.headers.get("if-none-match")
+    if sent and (sent.strip() == "*" or etag in (tag.strip() for tag in sent.split(","))):
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
+
+# Results are cached under the revision read before computing them; if /admin/model
+# swaps the model in between, the write is dropped instead of mislabelled
+async def predict(text):
+    probs = cache.get("prediction", text)
+    if probs is None:
+        revision = cache.revision
+        probs = await engine.predict(text)
+        models.mark_first_prediction()
+        cache.set("prediction", text, probs.tolist(), revision=revision)
+    return np.asarray(probs, dtype=np.float32)
+
+def explain_html(text, probs, method, revision=None):
+    # `revision`: the one `probs` came from, when the caller already scored the text
+    revision = revision or cache.revision
+    service = models
+    # The cache holds the explanation data (~1 KB); the HTML (~1.2 MB of inlined JS) is built per read
+    data = cache.get(f"explanation_data:{method}", text)
+    if data is None:
+        with STAGE_SECONDS.time("explanation"):
+            data = service.explain(text, probs, method, num_features=10, num_samples=100)
+        cache.set(f"explanation_data:{method}", text, data, revision=revision)
+    from explanation import render_html
+
+    with STAGE_SECONDS.time("render_html"):
+        return render_html(text, data)
 
 # --- 4. WEB SCRAPING ENDPOINT (Zëvendëson Google me DuckDuckGo) ---
 
-# --- 5. AUTHENTICATION ENDPOINTS ---
+# --- 5. HEALTH ---
+@app.get("/ready")
+async def ready():
+    if not models.ready:
+        raise HTTPException(status_code=503, detail=models.error or "Model is still loading.")
+    return {"status": "ready", "model": MODEL_PATH, "backend": INFERENCE_BACKEND, "registry_id": MODEL_ID,
+            "timings": {k: round(v, 3) for k, v in models.timings.items()}}
+
+@app.post("/admin/model")
+async def swap_model(data: ModelSwap, x_admin_token: Optional[str] = Header(None)):
+    global models, MODEL_PATH, MODEL_ID, INFERENCE_BACKEND
+    if not ADMIN_TOKEN or not secrets.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+    try:
+        entry = manifest_entry(MODEL_MANIFEST, data.id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No model manifest at {MODEL_MANIFEST}. Run evaluate_checkpoints.py.")
+    async with swap_lock:
+        candidate = build_models(entry["path"], entry["backend"])
+        # The current model keeps serving while the new one loads and warms up
+        await asyncio.to_thread(candidate.warmup)
+        if not candidate.ready:
+            raise HTTPException(status_code=500, detail=f"New model failed to load, keeping the current one: "
+                                                        f"{candidate.error}")
+        old = models
+        models, MODEL_PATH, MODEL_ID, INFERENCE_BACKEND = candidate, entry["path"], entry["id"], entry["backend"]
+        cache.switch(MODEL_PATH, cache_variant(INFERENCE_BACKEND))
+        if isinstance(old, InferencePool):
+            # Batches already handed to the old workers still finish
+            asyncio.get_running_loop().run_in_executor(None, lambda: old.close(wait=True))
+    return {"status": "swapped", "registry_id": MODEL_ID, "model": MODEL_PATH, "backend": INFERENCE_BACKEND,
+            "timings": {k: round(v, 3) for k, v in models.timings.items()}}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# --- 6. AUTHENTICATION ENDPOINTS ---
 @app.post("/signup")
 async def signup(user: UserAuth):
     try:
-        hashed = pwd_context.hash(user.password)
+        hashed = await hasher.hash(user.password)
         db.create_user(user.username, hashed)
         return {"message": "User created"}
     except Exception:
@@ -61,40 +301,112 @@ async def signup(user: UserAuth):
 @app.post("/login")
 async def login(user: UserAuth):
     db_user = db.get_user(user.username)
-    if db_user and pwd_context.verify(user.password, db_user['hashed_password']):
-        return {"status": "success", "username": user.username}
+    if db_user and await hasher.verify(user.password, db_user['hashed_password']):
+        return {"status": "success", "username": user.username, "token": sessions.issue(user.username),
+                "expires_in": int(sessions.ttl)}
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
-# --- 6. CORE LOGIC (ANALYZE, HISTORY, CRUD) ---
+# --- 7. CORE LOGIC (ANALYZE, HISTORY, CRUD) ---
 @app.post("/analyze")
-async def analyze_review(data: ReviewRequest):
-    raw_results = clf(data.review)[0]
-    best_res = max(raw_results, key=lambda x: x['score'])
-    label, conf = best_res['label'], f"{best_res['score']:.2%}"
+async def analyze_review(data: ReviewRequest, user: str = Depends(current_user)):
+    check_owner(data.username, user)
+    revision = cache.revision
+    probs = await predict(data.review)
+    label, score = models.classifier.top_label(probs)
+    conf = f"{score:.2%}"
     
-    db.save_review(data.username, datetime.now().strftime("%Y-%m-%d %H:%M"), data.movie, label, conf)
+    db.save_review(user, datetime.now().strftime("%Y-%m-%d %H:%M"), data.movie, label, score, data.review)
 
-    exp = explainer.explain_instance(data.review, predict_probs, num_features=10, num_samples=100)
-    available_labels = list(exp.local_exp.keys())
-    label_to_explain = available_labels[0] if available_labels else 0
-    
-    return {
-        "sentiment": label, "confidence": conf,
-        "explanation_html": exp.as_html(labels=[label_to_explain])
-    }
+    # job_id stays None when explanations are skipped or the worker pool is full
+    job_id = explanation_jobs.submit(explain_html, data.review, probs, data.explainer, revision) if data.explain else None
+
+    return {"sentiment": label, "confidence": conf, "job_id": job_id}
+
+# Upper bound on reviews scored per request, to keep memory per call bounded
+MAX_BATCH_REVIEWS = int(os.getenv("MAX_BATCH_REVIEWS", "10000"))
+
+async def analyze_many(username, movies, texts, dates=None, explain=False):
+    if len(texts) > MAX_BATCH_REVIEWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_REVIEWS} reviews per request.")
+    from bulk import save_scored
+    # Scored slice by slice, taking turns with the /analyze micro-batches; then one INSERT transaction
+    probs = await engine.predict_many(texts)
+    results = await asyncio.to_thread(save_scored, db, models.classifier.labels, username, movies, texts,
+                                      probs, dates)
+    if explain:
+        for result, text in zip(results, texts):
+            result["job_id"] = explanation_jobs.submit(explain_html, text, None, "fast")
+    return {"count": len(results), "results": results}
+
+@app.post("/analyze/batch")
+async def analyze_batch(data: BatchReviewRequest, user: str = Depends(current_user)):
+    check_owner(data.username, user)
+    return await analyze_many(user, [r.movie for r in data.reviews],
+                              [r.review for r in data.reviews], explain=data.explain)
+
+@app.post("/analyze/batch/csv")
+async def analyze_batch_csv(file: UploadFile = File(...), explain: bool = Form(False),
+                            username: Optional[str] = Form(None), user: str = Depends(current_user)):
+    check_owner(username, user)
+    from bulk import read_reviews_csv  # pulls in pandas, only needed for uploads
+    try:
+        df = read_reviews_csv(file.file)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await analyze_many(user, df["movie"].tolist(), df["text"].tolist(), df["date"].tolist(), explain)
+
+@app.get("/explanation/{job_id}")
+async def get_explanation(job_id: str):
+    job = explanation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation job.")
+    return job
 
 @app.get("/history/{username}")
-async def get_history(username: str):
-    return db.get_history(username)
+async def get_history(request: Request, response: Response, username: str,
+                      limit: Optional[int] = Query(None, ge=1, le=1000),
+                      before_id: Optional[int] = None, since_id: Optional[int] = None,
+                      user: str = Depends(current_user)):
+    check_owner(username, user)
+    cached = not_modified(request, response, diary_etag(username, "history", limit, before_id, since_id))
+    if cached is not None:
+        return cached
+    return db.get_history(username, limit=limit, before_id=before_id, since_id=since_id)
+
+@app.get("/stats/{username}")
+async def get_stats(request: Request, response: Response, username: str,
+                    period: Literal["day", "week", "month"] = "day", user: str = Depends(current_user)):
+    check_owner(username, user)
+    cached = not_modified(request, response, diary_etag(username, "stats", period))
+    if cached is not None:
+        return cached
+    return db.get_stats(username, period)
 
 @app.delete("/delete/{review_id}")
-async def delete_review(review_id: int):
-    db.delete_review(review_id)
+async def delete_review(review_id: int, user: str = Depends(current_user)):
+    if not db.delete_review(review_id, user):
+        raise HTTPException(status_code=404, detail="Review not found.")
     return {"message": "Deleted"}
 
 @app.put("/update/{review_id}")
-async def update_review(review_id: int, new_movie_name: str, new_review_text: str):
-    res = clf(new_review_text)[0]
-    best = max(res, key=lambda x: x['score'])
-    db.update_review(review_id, new_movie_name, best['label'], f"{best['score']:.2%}")
-    return {"message": "Update successful"}
\ No newline at end of file
+async def update_review(review_id: int, new_movie_name: str, new_review_text: str,
+                        user: str = Depends(current_user)):
+    label, score = models.classifier.top_label(await predict(new_review_text))
+    if not db.update_review(review_id, user, new_movie_name, label, score, new_review_text):
+        raise HTTPException(status_code=404, detail="Review not found.")
+    return {"message": "Update successful"}
+
+# --- 8. MOVIES & SEARCH ---
+@app.get("/movies/{title}/stats")
+async def movie_stats(title: str, user: str = Depends(current_user)):
+    # Titles match by canonical key, so "the dark knight" finds "The Dark Knight"
+    stats = db.get_movie_stats(title)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No reviews of this movie yet.")
+    return stats
+
+@app.get("/search")
+async def search(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100),
+                 user: str = Depends(current_user)):
+    # Movies (with their stats) from every diary; reviews only from the caller's own
+    return db.search(user, q, limit)
@@ -0,0 +1,232 @@
+import copy
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from metrics import STAGE_SECONDS
+
+REPO_ID = "vleramm/sentiment-model"
+LOCAL_DIR = "./sentiment-model"
+WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+# Written by evaluate_checkpoints.py next to the checkpoints it compared
+MANIFEST_PATH = os.path.join(LOCAL_DIR, "registry.json")
+WARMUP_TEXTS = ["A warm-up review.", "Another, slightly longer warm-up review to cover a second length."]
+
+
+def has_weights(path):
+    return os.path.isfile(os.path.join(path, "config.json")) and \
+        any(os.path.isfile(os.path.join(path, name)) for name in WEIGHT_FILES)
+
+
+def resolve_model_path(configured=None, local_dir=LOCAL_DIR, repo_id=REPO_ID):
+    """MODEL_PATH if set, else the local folder when it holds weights, else the hub id."""
+    if configured:
+        return configured
+    return local_dir if has_weights(local_dir) else repo_id
+
+
+def manifest_entry(manifest_path=MANIFEST_PATH, entry_id=None):
+    """The registry entry `entry_id` (default: the selected one), or None without a manifest.
+
+    Entry paths are stored relative to the manifest and returned resolved.
+    """
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    entry_id = entry_id or manifest["selected"]
+    entry = next((e for e in manifest["models"] if e["id"] == entry_id), None)
+    if entry is None:
+        raise KeyError(f"{entry_id!r} is not in {manifest_path}")
+    return {**entry, "path": os.path.normpath(os.path.join(os.path.dirname(manifest_path), entry["path"]))}
+
+
+def load_mmap(path, model_cls):
+    """Builds the model around `model.safetensors` mapped copy-on-write into memory.
+
+    The parameters point straight into the mapping, so every process that maps
+    the same file shares one set of weight pages through the OS page cache.
+    Returns None when the folder has no safetensors file or its keys don't match.
+    """
+    import torch
+    from transformers import AutoConfig
+
+    file = os.path.join(path, "model.safetensors")
+    if not os.path.isfile(file):
+        return None
+    dtypes = {"F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+              "I64": torch.int64, "I32": torch.int32, "U8": torch.uint8, "BOOL": torch.bool}
+    with open(file, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    (header_size,) = struct.unpack("<Q", mapped[:8])
+    header = json.loads(mapped[8:8 + header_size])
+    header.pop("__metadata__", None)
+    state = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        dtype = dtypes[info["dtype"]]
+        if end == start:
+            state[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        flat = torch.frombuffer(mapped, dtype=dtype, count=(end - start) // dtype.itemsize,
+                                offset=8 + header_size + start)
+        state[name] = flat.view(info["shape"])
+
+    model = model_cls.from_config(AutoConfig.from_pretrained(path))
+    result = model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    tied = {name for name, _ in model.named_parameters(remove_duplicate=False)} - set(model.state_dict())
+    if result.unexpected_keys or set(result.missing_keys) - tied:
+        return None
+    return model.eval()
+
+
+class ModelService:
+    """Loads the model once, on first use, and builds what the API needs from it.
+
+    Nothing heavy (torch, transformers, lime) is imported until `load()` or one
+    of the properties is touched, so importing the API is fast. Local folders
+    are always read with the Hugging Face Hub switched off; a hub id is looked
+    up in the local HF cache first and only downloaded when `offline` is False.
+    With `mmap` the weights are mapped from safetensors instead of copied (see
+    `load_mmap`). A `chunk_tokens` window length scores long texts in
+    overlapping windows (see `SequenceClassifier`); 0 truncates them at 512.
+    """
+
+    def __init__(self, path, backend="torch", onnx_dir=None, offline=False, mmap=False,
+                 chunk_tokens=0, chunk_overlap=0):
+        self.path = path
+        self.mmap = mmap
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.backend = backend
+        self.onnx_dir = onnx_dir or os.path.join(path, "onnx")
+        self.offline = offline or os.path.isdir(path)
+        self.timings = {}
+        self.error = None
+        self._ready = False
+        self._created = time.perf_counter()
+        self._lock = threading.RLock()
+        self._classifier = None
+        self._pipeline = None
+        self._lime_explainer = None
+        self._fast_explainer = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def load(self):
+        with self._lock:
+            if self._classifier is not None:
+                return self._classifier
+            start = time.perf_counter()
+            if self.offline:
+                # Must be set before huggingface_hub is imported to stop every network call
+                os.environ["HF_HUB_OFFLINE"] = "1"
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            from backends import load_backend
+            from inference import SequenceClassifier
+            self.timings["import_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            model, tokenizer = self._from_pretrained(AutoModelForSequenceClassification, AutoTokenizer)
+            backend = load_backend(self.backend, model, self.onnx_dir)
+            if self.chunk_tokens:
+                self._classifier = SequenceClassifier(model, tokenizer, backend=backend, max_length=self.chunk_tokens,
+                                                      chunk_overlap=self.chunk_overlap)
+            else:
+                self._classifier = SequenceClassifier(model, tokenizer, backend=backend)
+            self.timings["load_s"] = time.perf_counter() - start
+            return self._classifier
+
+    def _from_pretrained(self, model_cls, tokenizer_cls):
+        model = load_mmap(self.path, model_cls) if self.mmap and os.path.isdir(self.path) else None
+        if model is not None:
+            return model, tokenizer_cls.from_pretrained(self.path, local_files_only=True)
+        try:
+            return (model_cls.from_pretrained(self.path, local_files_only=True),
+                    tokenizer_cls.from_pretrained(self.path, local_files_only=True))
+        except OSError:
+            if self.offline:
+                raise
+        print(f"🌐 {self.path} is not in the local cache, downloading it from Hugging Face")
+        return model_cls.from_pretrained(self.path), tokenizer_cls.from_pretrained(self.path)
+
+    def warmup(self, texts=WARMUP_TEXTS):
+        """Loads the model and runs a dummy batch; errors are kept for /ready instead of raised."""
+        try:
+            classifier = self.load()
+            start = time.perf_counter()
+            classifier.predict_proba(texts)
+            self.timings["warmup_s"] = time.perf_counter() - start
+            self.timings["ready_after_s"] = time.perf_counter() - self._created
+            self._ready = True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ Model warm-up failed: {self.error}")
+
+    def mark_first_prediction(self):
+        if "first_prediction_after_s" not in self.timings:
+            self.timings["first_prediction_after_s"] = time.perf_counter() - self._created
+
+    def pipeline_proba(self, texts):
+        outputs = self.pipeline(texts)
+        return np.array([[out["score"] for out in sorted(row, key=lambda x: x["label"])] for row in outputs])
+
+    def explain(self, text, probs=None, method="fast", num_features=10, num_samples=100):
+        """LIME explanation as `explanation_data`; "fast" batches the perturbations, "lime" uses the pipeline."""
+        from explanation import explanation_data
+
+        with STAGE_SECONDS.time(f"explain_{method}"):
+            if method == "fast":
+                exp = self.fast_explainer.explain(text, probs, num_features=num_features, num_samples=num_samples)
+            else:
+                exp = self.lime_explainer.explain_instance(text, self.pipeline_proba,
+                                                           num_features=num_features, num_samples=num_samples)
+        return explanation_data(exp)
+
+    def explain_html(self, text, probs=None, method="fast", num_features=10, num_samples=100):
+        from explanation import render_html
+
+        data = self.explain(text, probs, method, num_features=num_features, num_samples=num_samples)
+        with STAGE_SECONDS.time("render_html"):
+            return render_html(text, data)
+
+    @property
+    def classifier(self):
+        return self._classifier or self.load()
+
+    @property
+    def pipeline(self):
+        # Only the "lime" explainer still goes through pipeline post-processing
+        with self._lock:
+            if self._pipeline is None:
+                from transformers import pipeline
+                classifier = self.classifier
+                # Its own tokenizer copy: holding `tokenizer_lock` for a whole LIME run
+                # would stall every /analyze batch behind it
+                self._pipeline = pipeline("sentiment-analysis", model=classifier.model,
+                                          tokenizer=copy.deepcopy(classifier.tokenizer), top_k=None)
+            return self._pipeline
+
+    @property
+    def lime_explainer(self):
+        with self._lock:
+            if self._lime_explainer is None:
+                from lime.lime_text import LimeTextExplainer
+                self._lime_explainer = LimeTextExplainer(class_names=self.classifier.labels)
+            return self._lime_explainer
+
+    @property
+    def fast_explainer(self):
+        with self._lock:
+            if self._fast_explainer is None:
+                from explanation import FastExplainer
+                self._fast_explainer = FastExplainer(self.classifier)
+            return self._fast_explainer
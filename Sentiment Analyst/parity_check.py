@@ -0,0 +1,76 @@
+# Compares every inference backend against PyTorch fp32 on test_data and fails
+# (exit code 1) when accuracy or label agreement drifts beyond the tolerance.
+# Usage: python parity_check.py [--model ./sentiment-model] [--tolerance 0.01]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from datasets import load_from_disk
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from backends import BACKENDS, load_backend
+from inference import SequenceClassifier
+
+LOCAL_DIR = "./sentiment-model"
+
+
+def measure(classifier, input_ids, latency_samples):
+    start = time.perf_counter()
+    probs = classifier.predict_ids(input_ids)
+    throughput = len(input_ids) / (time.perf_counter() - start)
+    timings = []
+    for ids in input_ids[:latency_samples]:
+        start = time.perf_counter()
+        classifier.predict_ids([ids])
+        timings.append(time.perf_counter() - start)
+    return probs, throughput, np.percentile(timings, 50) * 1000, np.percentile(timings, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=LOCAL_DIR)
+    parser.add_argument("--onnx-dir", help="defaults to <model>/onnx")
+    parser.add_argument("--data", default="test_data")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="max accuracy drop and max share of labels that may flip vs torch")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-samples", type=int, default=200)
+    args = parser.parse_args()
+    onnx_dir = args.onnx_dir or os.path.join(args.model, "onnx")
+
+    ds = load_from_disk(args.data)
+    input_ids, labels = ds["input_ids"], np.array(ds["label"])
+    model = AutoModelForSequenceClassification.from_pretrained(args.model)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+
+    rows, reference, failed = [], None, False
+    for kind in args.backends:
+        try:
+            backend = load_backend(kind, model, onnx_dir)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"⏭️  Skipping {kind}: {e}")
+            continue
+        classifier = SequenceClassifier(model, tokenizer, batch_size=args.batch_size, backend=backend)
+        probs, throughput, p50, p95 = measure(classifier, input_ids, args.latency_samples)
+        preds = probs.argmax(axis=1)
+        accuracy = (preds == labels).mean()
+        if reference is None:
+            reference = (accuracy, preds, probs)
+        agreement = (preds == reference[1]).mean()
+        drift = np.abs(probs - reference[2]).max()
+        ok = reference[0] - accuracy <= args.tolerance and agreement >= 1 - args.tolerance
+        failed |= not ok
+        rows.append((kind, accuracy, agreement, drift, p50, p95, throughput, "ok" if ok else "FAIL"))
+
+    print(f"\n{len(labels)} rows from {args.data}, reference = {args.backends[0]}")
+    print(f"{'backend':<10} {'accuracy':>9} {'agree':>7} {'max Δp':>8} {'p50 ms':>7} {'p95 ms':>7} {'rows/s':>8}  parity")
+    for kind, accuracy, agreement, drift, p50, p95, throughput, status in rows:
+        print(f"{kind:<10} {accuracy:>9.4f} {agreement:>7.2%} {drift:>8.4f} {p50:>7.2f} {p95:>7.2f} {throughput:>8.0f}  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
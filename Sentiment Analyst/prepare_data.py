@@ -1,10 +1,13 @@
 # 01_prepare_data.py
+import hashlib
 import os
 import pandas as pd
-from datasets import Dataset, DatasetDict
+from datasets import Dataset, DatasetDict, load_from_disk
 from sklearn.model_selection import train_test_split
 from transformers import AutoTokenizer
 
+from data_utils import normalize_columns
+
 # If in Colab, let user upload
 try:
     from google.colab import files  # type: ignore
@@ -25,51 +28,65 @@ if csv_path is None:
 print(f"✔ Loading {csv_path}")
 df = pd.read_csv(csv_path)
 
-# Normalize columns
-cols = {c.lower().strip(): c for c in df.columns}
-text_col = cols.get("text") or cols.get("review")
-label_col = cols.get("label") or cols.get("sentiment")
-if text_col is None or label_col is None:
-    raise ValueError("CSV must contain 'text' (or 'review') and 'label' (or 'sentiment').")
-
-df = df[[text_col, label_col]].rename(columns={text_col: "text", label_col: "label"})
-df["text"] = df["text"].astype(str).str.strip()
+# Normalize columns (shared with the bulk review import)
+df = normalize_columns(df, required=("text", "label"))
 
 # Map labels to 0/1
-if df["label"].dtype == object:
+if not pd.api.types.is_numeric_dtype(df["label"]):
     mapping = {"positive": 1, "negative": 0}
     df["label"] = df["label"].str.lower().map(mapping)
 if set(df["label"].unique()) - {0, 1}:
     raise ValueError("Labels must be 0/1 or 'positive'/'negative'.")
 
-# (Optional) keep a balanced subset for quick lessons (comment out to use full data)
-pos = df[df["label"] == 1]
-neg = df[df["label"] == 0]
-n = min(len(pos), len(neg), 3500)  # up to 7k rows total; tweak as needed
-df = pd.concat([pos.sample(n=n, random_state=42), neg.sample(n=n, random_state=42)]) \
-       .sample(frac=1.0, random_state=42).reset_index(drop=True)
-print(f"📊 Using {len(df)} rows (balanced subset).")
+# (Optional) keep a balanced subset for quick lessons; SUBSET_PER_CLASS=0 uses the full data
+SUBSET_PER_CLASS = int(os.getenv("SUBSET_PER_CLASS", "3500"))  # up to 7k rows total by default
+if SUBSET_PER_CLASS > 0:
+    pos = df[df["label"] == 1]
+    neg = df[df["label"] == 0]
+    n = min(len(pos), len(neg), SUBSET_PER_CLASS)
+    df = pd.concat([pos.sample(n=n, random_state=42), neg.sample(n=n, random_state=42)]) \
+           .sample(frac=1.0, random_state=42).reset_index(drop=True)
+    print(f"📊 Using {len(df)} rows (balanced subset).")
+else:
+    print(f"📊 Using all {len(df)} rows.")
 
 # Split (80/10/10) with stratify
 train_df, tmp_df = train_test_split(df, test_size=0.2, random_state=42, stratify=df["label"])
 val_df, test_df  = train_test_split(tmp_df, test_size=0.5, random_state=42, stratify=tmp_df["label"])
 
-# Wrap in HF datasets
-raw = DatasetDict({
-    "train": Dataset.from_pandas(train_df, preserve_index=False),
-    "validation": Dataset.from_pandas(val_df, preserve_index=False),
-    "test": Dataset.from_pandas(test_df, preserve_index=False),
-})
+# Tokenizer (tiny model for speed; can switch to distilbert-base-uncased); must match train_data.py
+MODEL_NAME = os.getenv("BASE_MODEL", "prajjwal1/bert-tiny")
+MAX_LENGTH = 128
+
+# Tokenized splits are cached under the fingerprint of the split rows and the tokenizer
+# settings, so re-running on unchanged data skips tokenization entirely
+CACHE_DIR = os.getenv("TOKENIZED_CACHE", ".tokenized_cache")
+digest = hashlib.sha256(f"{MODEL_NAME}|{MAX_LENGTH}".encode())
+for part in (train_df, val_df, test_df):
+    digest.update(pd.util.hash_pandas_object(part[["text", "label"]], index=False).values.tobytes())
+cache_path = os.path.join(CACHE_DIR, digest.hexdigest()[:16])
 
-# Tokenizer (tiny model for speed; can switch to distilbert-base-uncased)
-MODEL_NAME = "prajjwal1/bert-tiny"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+if os.path.exists(cache_path):
+    print(f"♻️  Reusing tokenized splits from {cache_path}")
+    tokenized = load_from_disk(cache_path)
+else:
+    # Wrap in HF datasets
+    raw = DatasetDict({
+        "train": Dataset.from_pandas(train_df, preserve_index=False),
+        "validation": Dataset.from_pandas(val_df, preserve_index=False),
+        "test": Dataset.from_pandas(test_df, preserve_index=False),
+    })
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
 
-# Tokenize with truncation to 128 tokens; pad dynamically later (faster than max_length padding)
-def tok(batch):
-    return tokenizer(batch["text"], truncation=True, max_length=128)
+    # Tokenize with truncation to 128 tokens; pad dynamically later (faster than max_length padding)
+    def tok(batch):
+        return tokenizer(batch["text"], truncation=True, max_length=MAX_LENGTH)
 
-tokenized = raw.map(tok, batched=True, remove_columns=["text"])
+    # Worker processes only pay off once there is enough text to split between them
+    NUM_PROC = int(os.getenv("NUM_PROC", str(os.cpu_count() or 1)))
+    num_proc = NUM_PROC if NUM_PROC > 1 and len(df) >= 10000 else None
+    tokenized = raw.map(tok, batched=True, batch_size=1000, num_proc=num_proc, remove_columns=["text"])
+    tokenized.save_to_disk(cache_path)
 
 # Save splits
 tokenized["train"].save_to_disk("train_data")
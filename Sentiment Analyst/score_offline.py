@@ -0,0 +1,157 @@
+# Streams a large dataset through the model and writes predictions to Parquet.
+# Inputs: a saved datasets folder (train_data / val_data / test_data, memory-mapped Arrow),
+# a CSV or a Parquet file. Pre-tokenized `input_ids` are used as-is when present.
+# Usage: python score_offline.py test_data --workers 4 [-o test_predictions.parquet]
+import argparse
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from data_utils import COLUMN_ALIASES
+from model_loader import resolve_model_path
+
+_classifier = None
+
+
+def _init_worker(model_path, threads, batch_size, max_length):
+    global _classifier
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    from inference import SequenceClassifier
+
+    # Each worker gets its own slice of the cores instead of all of them fighting
+    torch.set_num_threads(threads)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    _classifier = SequenceClassifier(model, tokenizer, batch_size=batch_size, max_length=max_length)
+
+
+def _score_chunk(kind, values):
+    real, padded = _classifier.real_tokens, _classifier.padded_tokens
+    probs = _classifier.predict_ids(values) if kind == "input_ids" else _classifier.predict_proba(values)
+    return probs, _classifier.real_tokens - real, _classifier.padded_tokens - padded
+
+
+def _labels(model_path):
+    from transformers import AutoConfig
+    config = AutoConfig.from_pretrained(model_path)
+    return [config.id2label[i] for i in range(config.num_labels)]
+
+
+def iter_chunks(path, chunk_size):
+    """Yields column dicts of at most ~chunk_size rows without loading the whole input."""
+    if os.path.isdir(path):
+        from datasets import load_from_disk
+        ds = load_from_disk(path)  # memory-mapped, rows are only read when sliced
+        for start in range(0, len(ds), chunk_size):
+            yield ds[start:start + chunk_size]
+    elif path.endswith(".parquet"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pydict()
+    else:
+        reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=8 << 20))
+        for batch in reader:
+            yield batch.to_pydict()
+
+
+def pick_column(columns, name):
+    lower = {c.lower().strip(): c for c in columns}
+    return next((lower[a] for a in COLUMN_ALIASES[name] if a in lower), None)
+
+
+def to_target(values, labels):
+    # 0/1 or "positive"/"negative" -> label index, None when unknown
+    names = [l.lower() for l in labels]
+    out = []
+    for v in values:
+        if isinstance(v, (int, np.integer)) and 0 <= v < len(labels):
+            out.append(int(v))
+        elif isinstance(v, str) and v.lower() in names:
+            out.append(names.index(v.lower()))
+        else:
+            out.append(None)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--model", default=resolve_model_path(None))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=4096, help="rows sent to a worker at a time")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-length", type=int, default=128, help="training length in prepare_data.py")
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.input.rstrip("/"))[0] + "_predictions.parquet"
+
+    labels = _labels(args.model)
+    schema = pa.schema([("row", pa.int64()), ("prediction", pa.string()), ("confidence", pa.float32())]
+                       + [(f"p_{label}", pa.float32()) for label in labels]
+                       + [("target", pa.string())])
+
+    ctx = mp.get_context("spawn")
+    pool = ctx.Pool(args.workers, initializer=_init_worker,
+                    initargs=(args.model, args.threads_per_worker, args.batch_size, args.max_length))
+    # At most two chunks in flight per worker keeps memory bounded for any input size
+    pending = deque()
+    offset, correct, labelled, real_tokens, padded_tokens = 0, 0, 0, 0, 0
+    start = time.perf_counter()
+
+    def flush(writer, item):
+        nonlocal correct, labelled, real_tokens, padded_tokens
+        row_start, targets, result = item
+        probs, real, padded = result.get()
+        real_tokens += real
+        padded_tokens += padded
+        best = probs.argmax(axis=1)
+        columns = {
+            "row": np.arange(row_start, row_start + len(probs)),
+            "prediction": [labels[i] for i in best],
+            "confidence": probs[np.arange(len(probs)), best],
+            **{f"p_{label}": probs[:, i] for i, label in enumerate(labels)},
+            "target": [None if t is None else labels[t] for t in targets],
+        }
+        writer.write_table(pa.table(columns, schema=schema))
+        known = [(t, b) for t, b in zip(targets, best) if t is not None]
+        labelled += len(known)
+        correct += sum(t == b for t, b in known)
+
+    with pq.ParquetWriter(output, schema) as writer:
+        for chunk in iter_chunks(args.input, args.chunk_size):
+            columns = list(chunk)
+            if "input_ids" in chunk:
+                kind, values = "input_ids", chunk["input_ids"]
+            else:
+                text_col = pick_column(columns, "text")
+                if text_col is None:
+                    raise ValueError("Input must have an 'input_ids' or 'text' (or 'review') column.")
+                kind, values = "text", ["" if t is None else str(t) for t in chunk[text_col]]
+            label_col = pick_column(columns, "label")
+            targets = to_target(chunk[label_col], labels) if label_col else [None] * len(values)
+
+            pending.append((offset, targets, pool.apply_async(_score_chunk, (kind, values))))
+            offset += len(values)
+            while len(pending) >= 2 * args.workers:
+                flush(writer, pending.popleft())
+        while pending:
+            flush(writer, pending.popleft())
+
+    pool.close()
+    pool.join()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {offset} rows in {elapsed:.1f}s ({offset / elapsed:.0f} rows/s) -> {output}")
+    print(f"🧮 Padding ratio: {1 - real_tokens / max(padded_tokens, 1):.1%}")
+    if labelled:
+        print(f"📈 Accuracy on {labelled} labelled rows: {correct / labelled:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,54 @@
 # 02_train_model.py — small-data, CPU-friendly full fine-tune
+# Full IMDB on CPU: SUBSET_PER_CLASS=0 python prepare_data.py, then
+# TRAIN_SAMPLES=0 VAL_SAMPLES=0 GRAD_ACCUM=2 python train_data.py
 import os
+import time
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 from datasets import load_from_disk
 from transformers import (
     AutoTokenizer, AutoModelForSequenceClassification,
-    TrainingArguments, Trainer, DataCollatorWithPadding, set_seed
+    TrainingArguments, Trainer, DataCollatorWithPadding, set_seed,
+    EarlyStoppingCallback, TrainerCallback
 )
 import numpy as np
 from sklearn.metrics import accuracy_score, f1_score
 import torch, os as _os
 
+from bucketing import LengthBucketSampler, length_batches, padding_ratio
+
 set_seed(42)
 
+# Pin the thread counts: compute threads for the forward/backward pass, the rest of
+# the cores go to dataloader workers (collation) so they don't steal from each other
+CPUS = os.cpu_count() or 1
+DATALOADER_WORKERS = int(os.getenv("DATALOADER_WORKERS", str(min(2, CPUS - 1))))
+TRAIN_THREADS = int(os.getenv("TRAIN_THREADS", str(max(1, CPUS - DATALOADER_WORKERS))))
+torch.set_num_threads(TRAIN_THREADS)
+print(f"🧵 {TRAIN_THREADS} compute threads, {DATALOADER_WORKERS} dataloader workers")
+
 # Load tokenized splits
 train_ds = load_from_disk("train_data")
 val_ds   = load_from_disk("val_data")
 
-# Cap sizes to keep runtime short on CPU (raise these if you have time/GPU)
+# Cap sizes to keep runtime short on CPU (raise these if you have time/GPU); 0 = use everything
 def cap(ds, n):
-    return ds.shuffle(seed=42).select(range(min(len(ds), n)))
+    return ds.shuffle(seed=42).select(range(min(len(ds), n))) if n > 0 else ds
 
-train_ds = cap(train_ds, 6000)   
-val_ds   = cap(val_ds,   1500)
+train_ds = cap(train_ds, int(os.getenv("TRAIN_SAMPLES", "6000")))
+val_ds   = cap(val_ds,   int(os.getenv("VAL_SAMPLES", "1500")))
+
+# Model choice — tiny for speed; same tokenizer as prepare_data.py.
+# The HF cache is tried first so a re-run doesn't go back to the Hub.
+MODEL_NAME = os.getenv("BASE_MODEL", "prajjwal1/bert-tiny")
+def from_cache_or_hub(cls, **kwargs):
+    try:
+        return cls.from_pretrained(MODEL_NAME, local_files_only=True, **kwargs)
+    except OSError:
+        return cls.from_pretrained(MODEL_NAME, **kwargs)
 
-# Model choice — tiny for speed;
-MODEL_NAME = "prajjwal1/bert-tiny"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, num_labels=2)
+tokenizer = from_cache_or_hub(AutoTokenizer)
+model = from_cache_or_hub(AutoModelForSequenceClassification, num_labels=2)
 
 # Ensure readable labels are saved with the model
 model.config.id2label = {0: "NEGATIVE", 1: "POSITIVE"}
@@ -36,22 +57,48 @@ model.config.label2id = {"NEGATIVE": 0, "POSITIVE": 1}
 # Dynamic padding speeds things up
 data_collator = DataCollatorWithPadding(tokenizer=tokenizer)
 
+# Length-bucketed batches: dynamic padding only pays off when a batch holds
+# similar lengths. Set GROUP_BY_LENGTH=0 to go back to plain random batches.
+GROUP_BY_LENGTH = os.getenv("GROUP_BY_LENGTH", "1") == "1"
+train_lengths = [len(ids) for ids in train_ds["input_ids"]]
+
 # Minimal args that work on older transformers; disable WANDB cleanly via report_to="none"
 # Some older versions don't accept report_to; guard it.
+class BucketedTrainer(Trainer):
+    def _get_train_sampler(self, *args, **kwargs):
+        if not GROUP_BY_LENGTH:
+            return super()._get_train_sampler(*args, **kwargs)
+        return LengthBucketSampler(train_lengths, self.args.per_device_train_batch_size, seed=self.args.seed)
+
+# Evaluate every epoch and stop once validation F1 hasn't improved for EARLY_STOPPING_PATIENCE
+# epochs; the best epoch is restored before saving
+EARLY_STOPPING_PATIENCE = int(os.getenv("EARLY_STOPPING_PATIENCE", "2"))
+
 def make_args():
     base = dict(
         output_dir="sentiment-model", 
-        per_device_train_batch_size=16,   # drop to 8 on CPU if OOM
+        per_device_train_batch_size=int(os.getenv("BATCH_SIZE", "16")),   # drop to 8 on CPU if OOM
+        # Effective batch = BATCH_SIZE * GRAD_ACCUM, without the memory of the bigger batch
+        gradient_accumulation_steps=int(os.getenv("GRAD_ACCUM", "1")),
         per_device_eval_batch_size=32,
-        num_train_epochs=8,               # small data needs more epochs
+        num_train_epochs=int(os.getenv("EPOCHS", "8")),   # small data needs more epochs
         learning_rate=2e-5,               # good for full fine-tune
         logging_steps=20,
         seed=42,
+        save_strategy="epoch",
+        load_best_model_at_end=True,
+        metric_for_best_model="f1",
+        dataloader_num_workers=DATALOADER_WORKERS,
+        dataloader_persistent_workers=DATALOADER_WORKERS > 0,
+        dataloader_pin_memory=torch.cuda.is_available(),
     )
-    try:
-        return TrainingArguments(**base, report_to="none")
-    except TypeError:
-        return TrainingArguments(**base)
+    # `evaluation_strategy` was renamed `eval_strategy`
+    for strategy in ("eval_strategy", "evaluation_strategy"):
+        try:
+            return TrainingArguments(**base, **{strategy: "epoch"}, report_to="none")
+        except TypeError:
+            continue
+    return TrainingArguments(**base, evaluation_strategy="epoch")
 
 args = make_args()
 
@@ -60,15 +107,60 @@ def compute_metrics(eval_pred):
     preds = np.argmax(logits, axis=-1)
     return {"accuracy": accuracy_score(labels, preds), "f1": f1_score(labels, preds)}
 
-trainer = Trainer(
+# Padding report: share of each epoch's tensors that is just [PAD]
+batch_size = args.per_device_train_batch_size
+shuffled = np.random.default_rng(42).permutation(len(train_lengths))
+random_batches = [shuffled[i:i + batch_size] for i in range(0, len(shuffled), batch_size)]
+bucketed_batches = length_batches(train_lengths, batch_size, shuffle=True, seed=42)
+print(f"🧮 Padding per epoch: random {padding_ratio(train_lengths, random_batches):.1%}, "
+      f"length-bucketed {padding_ratio(train_lengths, bucketed_batches):.1%} "
+      f"({'on' if GROUP_BY_LENGTH else 'off'})")
+
+class ThroughputReport(TrainerCallback):
+    """Prints samples/s and tokens/s for every epoch, next to its validation scores."""
+
+    def __init__(self, lengths):
+        self.samples = len(lengths)
+        self.tokens = int(np.sum(lengths))
+        self.rows = []
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        self.elapsed = time.perf_counter() - self.start
+
+    def on_evaluate(self, args, state, control, metrics=None, **kwargs):
+        if not hasattr(self, "elapsed"):
+            return
+        row = (len(self.rows) + 1, self.elapsed, self.samples / self.elapsed, self.tokens / self.elapsed,
+               metrics.get("eval_f1", float("nan")), metrics.get("eval_accuracy", float("nan")))
+        self.rows.append(row)
+        del self.elapsed
+        print(f"⏱️ epoch {row[0]}: {row[1]:.0f}s, {row[2]:.1f} samples/s, {row[3]:.0f} tokens/s, "
+              f"val F1 {row[4]:.4f}, accuracy {row[5]:.4f}")
+
+    def on_train_end(self, args, state, control, **kwargs):
+        print(f"\n{'epoch':>5} {'time s':>8} {'samples/s':>10} {'tokens/s':>10} {'val F1':>8} {'val acc':>8}")
+        for row in self.rows:
+            print(f"{row[0]:>5} {row[1]:>8.0f} {row[2]:>10.1f} {row[3]:>10.0f} {row[4]:>8.4f} {row[5]:>8.4f}")
+        if state.best_metric is not None:
+            print(f"🏁 best val F1 {state.best_metric:.4f} ({state.best_model_checkpoint})")
+
+trainer_kwargs = dict(
     model=model,
     args=args,
     train_dataset=train_ds,
     eval_dataset=val_ds,
-    tokenizer=tokenizer,           # fine for v4.x; v5 will use processing_class
     data_collator=data_collator,
     compute_metrics=compute_metrics,
+    callbacks=[EarlyStoppingCallback(early_stopping_patience=EARLY_STOPPING_PATIENCE),
+               ThroughputReport(train_lengths)],
 )
+try:
+    trainer = BucketedTrainer(**trainer_kwargs, processing_class=tokenizer)
+except TypeError:
+    trainer = BucketedTrainer(**trainer_kwargs, tokenizer=tokenizer)  # before processing_class (v4.46)
 
 # Train and then explicitly evaluate (compatible with older versions)
 trainer.train()
@@ -0,0 +1,140 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_loader import ModelService
+
+_service = None
+_error = None
+
+
+def _init_worker(path, backend, onnx_dir, offline, threads, chunk_tokens, chunk_overlap):
+    global _service, _error
+    import torch
+
+    # Each worker gets its own slice of the cores instead of all of them fighting
+    torch.set_num_threads(threads)
+    _service = ModelService(path, backend=backend, onnx_dir=onnx_dir, offline=offline, mmap=True,
+                            chunk_tokens=chunk_tokens, chunk_overlap=chunk_overlap)
+    _service.warmup()
+    _error = _service.error
+
+
+def _status():
+    return _error, _service.classifier.labels if _error is None else None, _service.timings
+
+
+def _predict_proba(texts):
+    return _service.classifier.predict_proba(texts)
+
+
+def _explain(text, probs, method, num_features, num_samples):
+    return _service.explain(text, probs, method, num_features=num_features, num_samples=num_samples)
+
+
+class PoolClassifier:
+    """The part of `SequenceClassifier` the API uses, answered by the worker processes."""
+
+    def __init__(self, pool, labels):
+        self._pool = pool
+        self.labels = labels
+
+    def top_label(self, probs):
+        idx = int(np.argmax(probs))
+        return self.labels[idx], float(probs[idx])
+
+    def predict_proba(self, texts):
+        return self._pool.apply(_predict_proba, (list(texts),))
+
+
+class InferencePool:
+    """`ModelService` stand-in that runs the model in `workers` spawned processes.
+
+    Each worker maps the safetensors weights copy-on-write, so the weight pages
+    are shared between workers instead of duplicated, and runs `threads` intra-op
+    threads. Calls are queued to whichever worker is free; both predictions and
+    LIME explanations run there, off the API process. Metrics recorded inside
+    the workers (model stage timings, padding ratio) stay there and never reach
+    /metrics.
+    """
+
+    def __init__(self, path, workers, threads=None, backend="torch", onnx_dir=None, offline=False,
+                 chunk_tokens=0, chunk_overlap=0):
+        self.path = path
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.offline = offline
+        self.timings = {}
+        self.error = None
+        self._ready = False
+        self._created = time.perf_counter()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._classifier = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def load(self):
+        with self._lock:
+            if self._classifier is not None:
+                return self._classifier
+            start = time.perf_counter()
+            self._pool = mp.get_context("spawn").Pool(
+                self.workers, initializer=_init_worker,
+                initargs=(self.path, self.backend, self.onnx_dir, self.offline, self.threads,
+                          self.chunk_tokens, self.chunk_overlap))
+            # Every worker loads and warms up in its initializer before taking work
+            error, labels, timings = self._pool.apply(_status)
+            if error is not None:
+                self.close()
+                raise RuntimeError(error)
+            self.timings.update({f"worker_{k}": v for k, v in timings.items()})
+            self.timings["load_s"] = time.perf_counter() - start
+            self._classifier = PoolClassifier(self._pool, labels)
+            return self._classifier
+
+    def warmup(self):
+        try:
+            self.load()
+            self.timings["ready_after_s"] = time.perf_counter() - self._created
+            self._ready = True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"❌ Inference pool failed to start: {self.error}")
+
+    def mark_first_prediction(self):
+        if "first_prediction_after_s" not in self.timings:
+            self.timings["first_prediction_after_s"] = time.perf_counter() - self._created
+
+    @property
+    def classifier(self):
+        return self._classifier or self.load()
+
+    def explain(self, text, probs=None, method="fast", num_features=10, num_samples=100):
+        self.load()
+        return self._pool.apply(_explain, (text, probs, method, num_features, num_samples))
+
+    def explain_html(self, text, probs=None, method="fast", num_features=10, num_samples=100):
+        from explanation import render_html
+
+        # Only the small explanation data crosses the process boundary; the HTML is built here
+        return render_html(text, self.explain(text, probs, method, num_features, num_samples))
+
+    def close(self, wait=False):
+        """Stops the workers; with `wait`, calls already queued finish first."""
+        if self._pool is not None:
+            if wait:
+                self._pool.close()
+                self._pool.join()
+            else:
+                self._pool.terminate()
+            self._pool = None